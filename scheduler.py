@@ -14,16 +14,36 @@ It just picks reasonable time slots inside the requested window.
 """
 
 import os
+import atexit
 import json
+import re
 import sys
+import queue
+import random
+import bisect
+import contextlib
+import functools
+import hashlib
+import math
 import smtplib
+import socket
+import ssl
+import sqlite3
+import threading
+import time
 import datetime as dt
-from email.mime.text import MIMEText
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from email.policy import SMTP as SMTP_POLICY
 from pathlib import Path
-from difflib import get_close_matches
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from collections import Counter
+from difflib import SequenceMatcher
 
 from dotenv import load_dotenv
 from google import genai  # Gemini / Google GenAI SDK
+from google.genai import errors as genai_errors
 
 # Google Calendar API imports
 try:
@@ -36,6 +56,28 @@ try:
 except ImportError:
     CALENDAR_AVAILABLE = False
 
+# Optional: faster fuzzy contact matching
+try:
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+# Optional: faster JSON (orjson errors subclass json.JSONDecodeError)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Optional: HTTP/2 support for the Gemini SDK's httpx client
+try:
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
 
 # ---------------------------------------------------------------------------
 # 1. Environment & client setup
@@ -52,7 +94,15 @@ if not GEMINI_API_KEY:
 # Docs: https://ai.google.dev/gemini-api/docs/quickstart
 # The key could also be picked up from GEMINI_API_KEY env var automatically,
 # but we'll pass it explicitly here for clarity.
-client = genai.Client(api_key=GEMINI_API_KEY)
+#
+# With h2 installed, the SDK's httpx client speaks HTTP/2, so concurrent
+# drafting requests share one multiplexed connection instead of each
+# opening (and TLS-handshaking) its own.
+client = genai.Client(
+    api_key=GEMINI_API_KEY,
+    http_options={"client_args": {"http2": True}} if H2_AVAILABLE else None,
+)
+GEMINI_MODEL = "gemini-2.5-flash"
 
 SMTP_HOST = os.getenv("SMTP_HOST")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
@@ -63,10 +113,30 @@ FROM_EMAIL = os.getenv("FROM_EMAIL", SMTP_USERNAME)
 FROM_NAME = os.getenv("FROM_NAME", "Meeting Assistant")
 DEFAULT_TIME_ZONE = os.getenv("DEFAULT_TIME_ZONE", "America/New_York")
 
+# SCHEDULER_DEBUG=1 prints the parsed meeting and candidate slots as JSON.
+DEBUG = os.getenv("SCHEDULER_DEBUG") == "1"
+
 # Calendar and contacts configuration
 CALENDAR_ID = os.getenv("CALENDAR_ID", "primary")
 CONTACTS_FILE = os.getenv("CONTACTS_FILE", "./contacts.json")
 CALENDAR_SCOPES = ["https://www.googleapis.com/auth/calendar"]  # Read/write access
+# Let Google Calendar email attendees the invitation / cancellation itself
+# (sendUpdates="all"); stock confirmation and cancellation emails are then
+# not also sent over SMTP.
+CALENDAR_NOTIFICATIONS = os.getenv("CALENDAR_NOTIFICATIONS") == "1"
+CALENDAR_SEND_UPDATES = "all" if CALENDAR_NOTIFICATIONS else "none"
+
+# Parse-result cache: exact repeats always hit; near-repeats only when a
+# similarity threshold is configured (e.g. 0.92). An empty PARSE_CACHE_FILE
+# turns the cache off.
+PARSE_CACHE_FILE = os.getenv("PARSE_CACHE_FILE", "./parse_cache.db")
+PARSE_CACHE_SIMILARITY = float(os.getenv("PARSE_CACHE_SIMILARITY", "0") or 0)
+EMBEDDING_MODEL = "text-embedding-004"
+
+# Drafted email text, keyed by a hash of the full prompt (also holds the
+# names of Gemini context caches, for reuse across runs).
+DRAFT_CACHE_FILE = os.getenv("DRAFT_CACHE_FILE", "./draft_cache.db")
+DRAFT_CACHE_TTL_SECONDS = 7 * 86400
 
 if not (SMTP_HOST and SMTP_USERNAME and SMTP_PASSWORD):
     raise RuntimeError(
@@ -78,128 +148,627 @@ if not (SMTP_HOST and SMTP_USERNAME and SMTP_PASSWORD):
 # 2. Utility: simple JSON extraction from model text
 # ---------------------------------------------------------------------------
 
+# Characters that can change the brace-scanner state below
+_JSON_SCAN_TOKEN = re.compile(r'[{}"\\]')
+
+
 def extract_json_from_text(text: str) -> dict:
     """
-    Gemini sometimes wraps JSON in code fences like ```json ... ``` or includes
-    extra commentary. This helper tries to pull out the JSON object.
+    Fallback for model output that is not bare JSON: Gemini sometimes wraps
+    JSON in code fences like ```json ... ``` or includes extra commentary.
+    This helper pulls out the first complete {...} object.
+
+    A single left-to-right scan tracks brace depth, ignoring braces inside
+    string literals, so fences and surrounding prose need no stripping.
+    The scan jumps between braces, quotes and backslashes only, skipping
+    ordinary text. Schema-constrained calls (see MEETING_SCHEMA) return
+    bare JSON and normally never need this.
+    """
+    start = text.find("{")
+    if start == -1:
+        raise json.JSONDecodeError("No JSON object found", text, 0)
+
+    depth = 0
+    in_string = False
+    escaped_at = -1
+    for match in _JSON_SCAN_TOKEN.finditer(text, start):
+        i = match.start()
+        if i == escaped_at:
+            continue
+        c = match.group()
+        if in_string:
+            if c == "\\":
+                escaped_at = i + 1
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return json_loads(text[start : i + 1])
+
+    raise json.JSONDecodeError("Unterminated JSON object", text, start)
+
+
+_TEMPLATE_FIELD = re.compile(r"\{(\w+)\}")
+
+
+def compile_template(template: str, **constants) -> list[tuple[str, str | None]]:
+    """
+    Pre-parse a template into (literal, field_name) pairs, so rendering is
+    a plain join instead of re-parsing the template per call.
 
-    This is intentionally simple; for production you'd want something more robust.
+    Only bare {name} fields are placeholders; any other braces (e.g. a JSON
+    example in a prompt) are literal text and need no doubling. Fields given
+    in `constants` are filled in now, leaving only the per-call fields for
+    render_template().
     """
-    text = text.strip()
+    parts = []
+    literal = ""
+    for i, piece in enumerate(_TEMPLATE_FIELD.split(template)):
+        if i % 2 == 0:
+            literal += piece
+        elif piece in constants:
+            literal += str(constants[piece])
+        else:
+            parts.append((literal, piece))
+            literal = ""
+    parts.append((literal, None))
+    return parts
 
-    # Remove code fences if present
-    if text.startswith("```"):
-        # Strip first fence
-        text = text.split("```", 1)[1]
-        # Strip potential language tag (e.g. "json\n")
-        text = text.lstrip("json").lstrip("python").lstrip().strip()
-        # Strip closing fence if still present
-        if "```" in text:
-            text = text.split("```", 1)[0].strip()
 
-    # Try direct JSON parse
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        # Fallback: try to find the first {...} block
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            candidate = text[start : end + 1]
-            return json.loads(candidate)
-        raise
+def render_template(parts: list[tuple[str, str | None]], values: dict) -> str:
+    """Fill a template compiled by compile_template() with `values`."""
+    return "".join(
+        literal + (str(values[field]) if field is not None else "")
+        for literal, field in parts
+    )
+
+
+# ---------------------------------------------------------------------------
+# 2a. Gemini context caching: upload static prompt prefixes once
+# ---------------------------------------------------------------------------
+
+PROMPT_CACHE_TTL_SECONDS = 3600
+# Gemini refuses to cache content below a model-specific size (1024 tokens
+# for gemini-2.5-flash). Prefixes estimated below this are sent inline
+# without asking the API first.
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+CHARS_PER_TOKEN = 4
+
+# kind -> (prefix hash, cached content name or None if refused, expires_at).
+# Mirrored in the draft cache file so later runs (the CLI makes one parse
+# call per process) reuse the server-side entry instead of creating and
+# abandoning a new one every time.
+_prompt_caches: dict[str, tuple[str, str | None, float]] = {}
+# Held while an entry is checked or (re)created, so concurrent requests for
+# the same prefix don't each create their own server-side cache. Also
+# guards _prompt_cache_conn.
+_prompt_caches_lock = threading.Lock()
+_prompt_cache_conn: sqlite3.Connection | None = None
+
+
+def _prompt_cache_db() -> sqlite3.Connection:
+    """Open the on-disk prompt-cache table on first use. Call with the lock held."""
+    global _prompt_cache_conn
+    if _prompt_cache_conn is None:
+        _prompt_cache_conn = sqlite3.connect(DRAFT_CACHE_FILE, check_same_thread=False)
+        with _prompt_cache_conn:
+            _prompt_cache_conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompt_caches "
+                "(kind TEXT PRIMARY KEY, prefix_hash TEXT NOT NULL, name TEXT, expires_at REAL NOT NULL)"
+            )
+    return _prompt_cache_conn
+
+
+def get_prompt_cache(kind: str, prefix: str) -> str | None:
+    """
+    Return the name of a Gemini cached-content entry holding `prefix`,
+    creating it on first use and recreating it when the prefix changes
+    or the entry is about to expire. Entries are remembered on disk, so
+    a run started within the TTL reuses the previous run's entry.
+
+    Returns None if the prefix is too small to cache or the API refuses it;
+    callers then send the prefix inline.
+    """
+    if len(prefix) < PROMPT_CACHE_MIN_TOKENS * CHARS_PER_TOKEN:
+        return None
+    # The API key is part of the hash: a cache created under another key (or
+    # project) doesn't resolve under this one
+    prefix_hash = hashlib.sha256(
+        f"{GEMINI_API_KEY or ''}\0{GEMINI_MODEL}\0{prefix}".encode("utf-8")
+    ).hexdigest()
+
+    with _prompt_caches_lock:
+        now = time.time()
+        db = _prompt_cache_db()
+        entry = _prompt_caches.get(kind)
+        if entry is None:
+            entry = db.execute(
+                "SELECT prefix_hash, name, expires_at FROM prompt_caches WHERE kind = ?", (kind,)
+            ).fetchone()
+        if entry and entry[0] == prefix_hash:
+            name, expires_at = entry[1], entry[2]
+            if now < expires_at - 60:
+                _prompt_caches[kind] = tuple(entry)
+                return name
+
+        if entry and entry[1]:
+            # Prefix changed (or expired): drop the stale server-side entry
+            try:
+                client.caches.delete(name=entry[1])
+            except genai_errors.APIError:
+                pass
+
+        try:
+            cache = client.caches.create(
+                model=GEMINI_MODEL,
+                config={"contents": [prefix], "ttl": f"{PROMPT_CACHE_TTL_SECONDS}s"},
+            )
+            name = cache.name
+        except genai_errors.APIError:
+            name = None
+        # A refusal is remembered for a TTL too, rather than re-asked every run
+        entry = (prefix_hash, name, now + PROMPT_CACHE_TTL_SECONDS)
+        _prompt_caches[kind] = entry
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO prompt_caches (kind, prefix_hash, name, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (kind, *entry),
+            )
+        return name
+
+
+# Retries for rate-limited (429) or temporarily unavailable Gemini calls,
+# backing off 1s, 2s, 4s, ... (capped) plus random jitter.
+GEMINI_MAX_ATTEMPTS = 5
+GEMINI_RETRYABLE_CODES = (429, 500, 503, 504)
+GEMINI_BACKOFF_BASE_SECONDS = 1.0
+GEMINI_BACKOFF_MAX_SECONDS = 30.0
+
+
+def _generate_with_retry(**kwargs):
+    """
+    client.models.generate_content() that retries transient API errors with
+    exponential backoff plus jitter, re-raising after the last attempt.
+    """
+    for attempt in range(GEMINI_MAX_ATTEMPTS):
+        try:
+            return client.models.generate_content(**kwargs)
+        except genai_errors.APIError as e:
+            if (getattr(e, "code", None) not in GEMINI_RETRYABLE_CODES
+                    or attempt == GEMINI_MAX_ATTEMPTS - 1):
+                raise
+            delay = min(GEMINI_BACKOFF_MAX_SECONDS, GEMINI_BACKOFF_BASE_SECONDS * 2 ** attempt)
+            # Jitter spreads out concurrent requests that failed together
+            time.sleep(delay + random.uniform(0, GEMINI_BACKOFF_BASE_SECONDS))
+
+
+def _drop_prompt_cache(kind: str) -> None:
+    """Forget the remembered cache entry for `kind`, in memory and on disk."""
+    with _prompt_caches_lock:
+        _prompt_caches.pop(kind, None)
+        db = _prompt_cache_db()
+        with db:
+            db.execute("DELETE FROM prompt_caches WHERE kind = ?", (kind,))
+
+
+def generate_with_prefix(kind: str, prefix: str, suffix: str, config: dict | None = None):
+    """
+    Call Gemini with a static `prefix` and a per-request `suffix`,
+    referencing the prefix through context caching when possible.
+    Transient errors are retried (see _generate_with_retry()).
+
+    If the cached content is rejected (deleted elsewhere, expired early,
+    or made under another API key), the entry is forgotten and the call
+    is retried once with the prefix inline.
+    """
+    config = dict(config or {})
+    cache_name = get_prompt_cache(kind, prefix)
+    if cache_name:
+        try:
+            return _generate_with_retry(
+                model=GEMINI_MODEL,
+                contents=suffix,
+                config=dict(config, cached_content=cache_name),
+            )
+        except genai_errors.APIError as e:
+            # Overload errors already had their retries; only a rejected
+            # cache reference is worth falling back from
+            if getattr(e, "code", None) in GEMINI_RETRYABLE_CODES:
+                raise
+            _drop_prompt_cache(kind)
+    return _generate_with_retry(
+        model=GEMINI_MODEL,
+        contents=prefix + suffix,
+        config=config or None,
+    )
+
+
+class DraftCache:
+    """
+    On-disk (SQLite) cache of drafted email text, keyed by SHA-256 of the
+    model and full prompt, so re-running the same request (or cancelling
+    the same event again) skips Gemini. Entries expire after
+    DRAFT_CACHE_TTL_SECONDS. Safe to use from several threads.
+    """
+    def __init__(self, filepath: str = DRAFT_CACHE_FILE, ttl: float = DRAFT_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(filepath, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS draft_cache "
+                "(key TEXT PRIMARY KEY, text TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+            self.conn.execute("DELETE FROM draft_cache WHERE ts < ?", (time.time() - ttl,))
+
+    @staticmethod
+    def key(prefix: str, suffix: str) -> str:
+        text = f"{GEMINI_MODEL}\0{prefix}\0{suffix}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Cached text for `key`, or None if missing or expired."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT text FROM draft_cache WHERE key = ? AND ts >= ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO draft_cache (key, text, ts) VALUES (?, ?, ?)",
+                (key, text, time.time()),
+            )
+
+
+_draft_cache: DraftCache | None = None
+_draft_cache_lock = threading.Lock()
+
+
+def get_draft_cache() -> DraftCache:
+    """Return the process-wide draft cache, opening it on first use."""
+    global _draft_cache
+    with _draft_cache_lock:
+        if _draft_cache is None:
+            _draft_cache = DraftCache()
+        return _draft_cache
+
+
+def generate_text(kind: str, prefix: str, suffix: str) -> str:
+    """
+    Drafting call: generate_with_prefix() reduced to its stripped text,
+    served from the draft cache when the same prompt was answered recently.
+    """
+    cache = get_draft_cache()
+    key = DraftCache.key(prefix, suffix)
+    text = cache.get(key)
+    if text is None:
+        text = generate_with_prefix(kind, prefix, suffix).text.strip()
+        cache.put(key, text)
+    return text
+
+
+# Gemini requests allowed in flight at once by generate_many().
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "5"))
+
+
+def generate_many(kind: str, prefix: str, suffixes: list[str]) -> list[str]:
+    """
+    generate_text() for several independent suffixes, with up to
+    GEMINI_CONCURRENCY requests in flight. Texts come back in order.
+    The SDK call blocks on the network, so threads overlap the waits.
+    """
+    if len(suffixes) <= 1:
+        return [generate_text(kind, prefix, suffix) for suffix in suffixes]
+    with ThreadPoolExecutor(max_workers=min(GEMINI_CONCURRENCY, len(suffixes))) as executor:
+        return list(executor.map(lambda suffix: generate_text(kind, prefix, suffix), suffixes))
 
 
 # ---------------------------------------------------------------------------
 # 2b. Contact Memory: remember emails for people
 # ---------------------------------------------------------------------------
 
+def _trigrams(text: str) -> set[str]:
+    """Padded character 3-grams of a string, so short names still get some."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
 class ContactMemory:
     """
     Simple contact storage: remembers name -> email mappings.
     Saves to a JSON file for persistence across runs.
     """
-    def __init__(self, filepath: str = CONTACTS_FILE):
+    # How many trigram-ranked candidates get a full SequenceMatcher comparison
+    FUZZY_CANDIDATES = 5
+
+    def __init__(self, filepath: str = CONTACTS_FILE, pretty: bool = False):
         self.filepath = Path(filepath)
+        # Indent the saved file for humans; compact otherwise
+        self.pretty = pretty
+        self._changed_keys: set[str] = set()
         self.contacts = self._load()
+        self._dirty = False
+        self._contacts_text: str | None = None
+        # Fuzzy-match indexes, built on the first fuzzy_match() call
+        self._indexed = False
+        self._keys_by_length: dict[int, list[str]] = {}
+        self._trigram_index: dict[str, set[str]] = {}
+        self._trigram_counts: dict[str, int] = {}
+        # Don't lose unsaved contacts if the process exits without a flush()
+        atexit.register(self.flush)
 
     def _load(self) -> dict:
         """Load contacts from JSON file."""
         if not self.filepath.exists():
             return {}
         try:
-            with open(self.filepath, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return json_loads(self.filepath.read_bytes())
         except (json.JSONDecodeError, IOError):
             return {}
 
+    def _ensure_indexed(self) -> None:
+        """Build the trigram and length indexes over all contacts, once."""
+        if not self._indexed:
+            for key in self.contacts:
+                self._index_key(key)
+            self._indexed = True
+
+    def _index_key(self, key: str) -> None:
+        """Add a contact key to the trigram and length indexes."""
+        self._keys_by_length.setdefault(len(key), []).append(key)
+        grams = _trigrams(key)
+        self._trigram_counts[key] = len(grams)
+        for gram in grams:
+            self._trigram_index.setdefault(gram, set()).add(key)
+
     def save(self) -> None:
-        """Save contacts to JSON file."""
-        with open(self.filepath, "w", encoding="utf-8") as f:
-            json.dump(self.contacts, f, indent=2, ensure_ascii=False)
+        """
+        Save contacts to JSON file.
+        Writes a temp file next to it and renames it into place, so a crash
+        mid-write never leaves a truncated contacts file.
+        """
+        if ORJSON_AVAILABLE:
+            payload = orjson.dumps(self.contacts, option=orjson.OPT_INDENT_2 if self.pretty else 0)
+        elif self.pretty:
+            payload = json.dumps(self.contacts, indent=2, ensure_ascii=False).encode("utf-8")
+        else:
+            payload = json.dumps(
+                self.contacts, separators=(",", ":"), ensure_ascii=False
+            ).encode("utf-8")
+        tmp_path = self.filepath.with_name(self.filepath.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            # Make the data durable before the rename makes it visible
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.filepath)
+        self._changed_keys.clear()
+        self._dirty = False
+
+    def flush(self) -> None:
+        """Save contacts only if they changed since the last save."""
+        if self._dirty:
+            self.save()
 
     def add_contact(self, name: str, email: str) -> None:
-        """Add or update a contact."""
-        if not name or not email:
-            return
-        # Normalize name to lowercase for case-insensitive matching
-        key = name.strip().lower()
-        self.contacts[key] = email.strip()
-        self.save()
+        """
+        Add or update a contact in memory. Call flush() to persist.
+        """
+        self.add_contacts([(name, email)])
+
+    def add_contacts(self, pairs) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+        """
+        Add or update several (name, email) contacts in one pass, skipping
+        incomplete pairs and ones that are already stored unchanged.
+        Returns (added, updated) lists of (name, email). Call flush() to persist.
+        """
+        added: list[tuple[str, str]] = []
+        updated: list[tuple[str, str]] = []
+        for name, email in pairs:
+            if not name or not email:
+                continue
+            # Normalize name to lowercase for case-insensitive matching
+            key = name.strip().lower()
+            email = email.strip()
+            existing = self.contacts.get(key)
+            if existing == email:
+                continue
+            if existing is None:
+                if self._indexed:
+                    self._index_key(key)
+                added.append((name, email))
+            else:
+                updated.append((name, email))
+            self.contacts[key] = email
+            self._changed_keys.add(key)
+
+        if added or updated:
+            self._contacts_text = None
+            self._dirty = True
+        return added, updated
 
     def get_email(self, name: str) -> str | None:
         """Get email for a name. Returns None if not found."""
         key = name.strip().lower()
         return self.contacts.get(key)
 
+    def _length_range(self, length: int, threshold: float) -> range:
+        """
+        Key lengths that can reach `threshold` against a query of `length`.
+        Both scorers compute 2*matches / (len(a) + len(b)), and matches can't
+        exceed the shorter length, which bounds how far lengths may differ.
+        """
+        if threshold <= 0:
+            return range(0, max(self._keys_by_length, default=0) + 1)
+        shortest = math.ceil(threshold * length / (2 - threshold) - 1e-9)
+        longest = math.floor(length * (2 - threshold) / threshold + 1e-9)
+        return range(shortest, longest + 1)
+
     def fuzzy_match(self, name: str, threshold: float = 0.6) -> str | None:
         """
         Try to find a contact by fuzzy matching the name.
         Returns the email if a close match is found, else None.
+
+        Only keys whose length could reach the threshold are considered.
+        With rapidfuzz installed, those are all scored in one C++ pass.
+        Otherwise they are shortlisted by trigram (Jaccard) overlap, and only
+        the top few are scored with SequenceMatcher.
         """
+        self._ensure_indexed()
         key = name.strip().lower()
-        matches = get_close_matches(key, self.contacts.keys(), n=1, cutoff=threshold)
-        if matches:
-            return self.contacts[matches[0]]
+        lengths = self._length_range(len(key), threshold)
+        if RAPIDFUZZ_AVAILABLE:
+            candidates = [
+                candidate
+                for length in lengths
+                for candidate in self._keys_by_length.get(length, ())
+            ]
+            match = process.extractOne(
+                key, candidates, scorer=fuzz.ratio, score_cutoff=threshold * 100
+            )
+            return self.contacts[match[0]] if match else None
+
+        grams = _trigrams(key)
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(self._trigram_index.get(gram, ()))
+        candidates = [candidate for candidate in overlap if len(candidate) in lengths]
+        if not candidates:
+            return None
+
+        def jaccard(candidate: str) -> float:
+            shared = overlap[candidate]
+            return shared / (len(grams) + self._trigram_counts[candidate] - shared)
+
+        shortlist = sorted(candidates, key=jaccard, reverse=True)[:self.FUZZY_CANDIDATES]
+
+        best_key, best_ratio = None, threshold
+        matcher = SequenceMatcher()
+        matcher.set_seq2(key)
+        for candidate in shortlist:
+            matcher.set_seq1(candidate)
+            ratio = matcher.ratio()
+            if ratio >= best_ratio:
+                best_key, best_ratio = candidate, ratio
+        if best_key is not None:
+            return self.contacts[best_key]
         return None
 
     def get_all_contacts_text(self) -> str:
         """
         Return a formatted string of all contacts for injection into prompts.
+        The string is cached until the contacts change.
         """
-        if not self.contacts:
-            return "(No saved contacts yet.)"
-        lines = [f"- {name.title()}: {email}" for name, email in self.contacts.items()]
-        return "\n".join(lines)
+        if self._contacts_text is None:
+            if not self.contacts:
+                self._contacts_text = "(No saved contacts yet.)"
+            else:
+                lines = [f"- {name.title()}: {email}" for name, email in self.contacts.items()]
+                self._contacts_text = "\n".join(lines)
+        return self._contacts_text
+
+
+class SQLiteContactMemory(ContactMemory):
+    """
+    ContactMemory persisted in a SQLite file instead of JSON.
+    Saving writes only the contacts changed since the last save, rather
+    than re-serializing the whole address book.
+    """
+    def _load(self) -> dict:
+        """Open (creating if needed) the database and load all contacts."""
+        self.conn = sqlite3.connect(self.filepath)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS contacts (key TEXT PRIMARY KEY, email TEXT NOT NULL)"
+        )
+        return dict(self.conn.execute("SELECT key, email FROM contacts"))
+
+    def save(self) -> None:
+        """Upsert the changed contacts in a single transaction."""
+        rows = [(key, self.contacts[key]) for key in self._changed_keys]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO contacts (key, email) VALUES (?, ?)", rows
+            )
+        self._changed_keys.clear()
+        self._dirty = False
+
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+def open_contact_memory(filepath: str = CONTACTS_FILE, pretty: bool = False) -> ContactMemory:
+    """
+    Return the contact store for `filepath`: SQLite for .db/.sqlite files,
+    else JSON (indented if `pretty`).
+    """
+    if Path(filepath).suffix.lower() in SQLITE_SUFFIXES:
+        return SQLiteContactMemory(filepath)
+    return ContactMemory(filepath, pretty=pretty)
 
 
 # ---------------------------------------------------------------------------
 # 2c. Google Calendar: check availability
 # ---------------------------------------------------------------------------
 
-def get_calendar_service():
+# The service object is built once per process; building it means reading
+# token.json, validating OAuth and fetching the discovery document.
+_SERVICE_SINGLETON = None
+# Set once the first build attempt finishes, successful or not, so a missing
+# or broken setup isn't re-checked on disk by every caller.
+_service_attempted = False
+_service_lock = threading.Lock()
+
+# OAuth credentials shared by the service and the background refresher.
+# Always read or mutate them while holding _creds_lock.
+_creds = None
+_creds_lock = threading.Lock()
+_refresh_thread: threading.Thread | None = None
+# Refresh the access token this long before it expires.
+TOKEN_REFRESH_MARGIN = dt.timedelta(minutes=5)
+TOKEN_PATH = Path("token.json")
+CREDENTIALS_PATH = Path("credentials.json")
+
+# FreeBusy responses keyed by (calendar_id, time_min, time_max) ->
+# (fetched_at, busy_times), all datetimes aware UTC. Entries older than the
+# TTL are evicted.
+BUSY_CACHE_TTL_SECONDS = 60
+_busy_cache: dict[tuple[str, dt.datetime, dt.datetime], tuple[float, list[dict]]] = {}
+
+
+def _save_token(creds) -> None:
+    """Persist credentials so the next run can skip the OAuth flow."""
+    with open(TOKEN_PATH, "w") as token_file:
+        token_file.write(creds.to_json())
+
+
+def _load_credentials():
     """
-    Authenticate and return a Google Calendar API service object.
-    Uses OAuth 2.0 flow with local credentials.
+    Load credentials from token.json, refreshing or running the OAuth flow
+    if needed. Returns None when no credentials are available.
     """
-    if not CALENDAR_AVAILABLE:
-        return None
-
     creds = None
-    token_path = Path("token.json")
-    creds_path = Path("credentials.json")
 
     # Load existing token if available
-    if token_path.exists():
-        creds = Credentials.from_authorized_user_file(str(token_path), CALENDAR_SCOPES)
+    if TOKEN_PATH.exists():
+        creds = Credentials.from_authorized_user_file(str(TOKEN_PATH), CALENDAR_SCOPES)
 
     # If no valid credentials, authenticate
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
-        elif creds_path.exists():
+        elif CREDENTIALS_PATH.exists():
             flow = InstalledAppFlow.from_client_secrets_file(
-                str(creds_path), CALENDAR_SCOPES
+                str(CREDENTIALS_PATH), CALENDAR_SCOPES
             )
             creds = flow.run_local_server(port=0)
         else:
@@ -207,59 +776,295 @@ def get_calendar_service():
             return None
 
         # Save credentials for next run
-        with open(token_path, "w") as token_file:
-            token_file.write(creds.to_json())
+        _save_token(creds)
+
+    return creds
+
+
+def _refresh_loop() -> None:
+    """
+    Background (daemon) loop that refreshes the shared credentials shortly
+    before they expire, so foreground API calls never block on OAuth.
+    """
+    while True:
+        with _creds_lock:
+            expiry = _creds.expiry if _creds and _creds.refresh_token else None
+        if expiry is None:
+            return
 
+        # google-auth reports expiry as naive UTC
+        now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+        wait = (expiry - TOKEN_REFRESH_MARGIN - now).total_seconds()
+        if wait > 0:
+            time.sleep(wait)
+
+        with _creds_lock:
+            old_token = _creds.token
+            try:
+                _creds.refresh(Request())
+            except Exception:
+                # Leave it to the client library to refresh on demand
+                return
+            if _creds.token != old_token:
+                _save_token(_creds)
+
+
+def _start_refresh_thread() -> None:
+    """Start the token refresher once per process."""
+    global _refresh_thread
+    if _refresh_thread is None:
+        _refresh_thread = threading.Thread(target=_refresh_loop, daemon=True)
+        _refresh_thread.start()
+
+
+def _build_calendar(creds):
+    """
+    Build the Calendar v3 client from the discovery document bundled with
+    google-api-python-client, avoiding the ~200KB discovery download.
+    """
     try:
-        service = build("calendar", "v3", credentials=creds)
-        return service
-    except Exception:
+        return build(
+            "calendar", "v3", credentials=creds,
+            static_discovery=True, cache_discovery=False,
+        )
+    except TypeError:
+        # google-api-python-client < 2.0 has no bundled documents
+        return build("calendar", "v3", credentials=creds)
+
+
+def get_calendar_service():
+    """
+    Authenticate and return a Google Calendar API service object.
+    Uses OAuth 2.0 flow with local credentials.
+    The result (service or None) is computed once per process, even when
+    several threads ask at the same time, and the credentials are kept
+    fresh in place by a background thread.
+    """
+    global _SERVICE_SINGLETON, _service_attempted, _creds
+
+    if not CALENDAR_AVAILABLE:
         return None
 
+    if _service_attempted:
+        return _SERVICE_SINGLETON
+
+    with _service_lock:
+        if _service_attempted:
+            return _SERVICE_SINGLETON
+        try:
+            with _creds_lock:
+                if _creds is None:
+                    _creds = _load_credentials()
+                creds = _creds
+            if creds is not None:
+                _start_refresh_thread()
+                _SERVICE_SINGLETON = _build_calendar(creds)
+        except Exception:
+            _SERVICE_SINGLETON = None
+        _service_attempted = True
+        return _SERVICE_SINGLETON
+
+
+@functools.lru_cache(maxsize=None)
+def _time_zone(name: str) -> dt.tzinfo:
+    """
+    ZoneInfo for an IANA name. An unknown name (e.g. an LLM-invented
+    "Eastern Time") falls back to DEFAULT_TIME_ZONE, and only if that can't
+    be loaded either (no tz database) to UTC, with a warning.
+    """
+    for candidate in (name, DEFAULT_TIME_ZONE):
+        try:
+            return ZoneInfo(candidate)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    print(f"   ⚠ Unknown time zone {name!r} (is tzdata installed?); using UTC")
+    return dt.timezone.utc
+
+
+def _to_utc(value: dt.datetime, zone: dt.tzinfo) -> dt.datetime:
+    """Aware UTC form of `value`; a naive value is wall-clock time in `zone`."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=zone)
+    return value.astimezone(dt.timezone.utc)
+
+
+def _month_window(time_min: dt.datetime, time_max: dt.datetime) -> tuple[dt.datetime, dt.datetime]:
+    """
+    Widen [time_min, time_max] to whole months, so later queries that fall
+    inside the same month(s) can be answered from the cache.
+    """
+    start = time_min.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = time_max.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if end.month == 12:
+        end = end.replace(year=end.year + 1, month=1)
+    else:
+        end = end.replace(month=end.month + 1)
+    return start, end
+
+
+def _get_cached_busy_times(calendar_id: str, time_min: dt.datetime,
+                           time_max: dt.datetime) -> list[dict] | None:
+    """
+    Return busy times for [time_min, time_max] from a cached FreeBusy response
+    covering that window, or None on a miss. Expired entries are evicted.
+    """
+    now = time.monotonic()
+    for key in [k for k, (fetched_at, _) in _busy_cache.items()
+                if now - fetched_at > BUSY_CACHE_TTL_SECONDS]:
+        del _busy_cache[key]
+
+    for (cached_id, cached_min, cached_max), (_, busy_times) in _busy_cache.items():
+        if cached_id != calendar_id:
+            continue
+        if cached_min <= time_min and time_max <= cached_max:
+            # Slice the cached window down to the requested one
+            return [b for b in busy_times if b["start"] < time_max and b["end"] > time_min]
+    return None
+
+
+# The FreeBusy API accepts at most this many calendars per query.
+FREEBUSY_MAX_CALENDARS = 50
 
-def get_busy_times(service, time_min: dt.datetime, time_max: dt.datetime) -> list[dict]:
+
+def get_busy_times(service, time_min: dt.datetime, time_max: dt.datetime,
+                   calendar_ids: list[str] | None = None,
+                   time_zone: str = DEFAULT_TIME_ZONE) -> tuple[list[dt.datetime], list[dt.datetime]]:
     """
     Query Google Calendar for busy times between time_min and time_max.
-    Returns a list of dicts: [{"start": datetime, "end": datetime}, ...]
+    Returns merged, ascending (starts, ends) lists (see merge_busy_times()),
+    ready for find_conflict().
+
+    Naive time_min/time_max are wall-clock times in `time_zone`, and the
+    busy periods come back naive in that zone too, so they compare directly
+    with the caller's slots. Aware inputs get aware (UTC) results.
+
+    calendar_ids defaults to [CALENDAR_ID]; busy periods from every calendar
+    are combined, and all uncached calendars are sent in a single FreeBusy
+    query. Calendars the API can't read (e.g. external attendees) count as free.
+
+    The whole month(s) around the window are fetched and cached for
+    BUSY_CACHE_TTL_SECONDS, so repeat queries skip the FreeBusy round-trip.
     """
     if not service:
-        return []
+        return [], []
+
+    zone = _time_zone(time_zone)
+    utc_min, utc_max = _to_utc(time_min, zone), _to_utc(time_max, zone)
+
+    busy_times: list[dict] = []
+    missing = []
+    for calendar_id in dict.fromkeys(calendar_ids or [CALENDAR_ID]):
+        cached = _get_cached_busy_times(calendar_id, utc_min, utc_max)
+        if cached is None:
+            missing.append(calendar_id)
+        else:
+            busy_times.extend(cached)
+    if missing:
+        busy_times.extend(_fetch_busy_times(service, missing, utc_min, utc_max))
+
+    if time_min.tzinfo is None:
+        busy_times = [
+            {"start": b["start"].astimezone(zone).replace(tzinfo=None),
+             "end": b["end"].astimezone(zone).replace(tzinfo=None)}
+            for b in busy_times
+        ]
+    return merge_busy_times(busy_times)
+
+
+def _fetch_busy_times(service, calendar_ids: list[str], utc_min: dt.datetime,
+                      utc_max: dt.datetime) -> list[dict]:
+    """
+    Fetch the month(s) around [utc_min, utc_max] for `calendar_ids` with
+    batched FreeBusy queries and cache them. Returns the busy periods that
+    fall inside the window, as aware UTC datetimes.
+    """
+    fetch_min, fetch_max = _month_window(utc_min, utc_max)
+    busy_times: list[dict] = []
 
     try:
-        body = {
-            "timeMin": time_min.isoformat() + "Z",
-            "timeMax": time_max.isoformat() + "Z",
-            "items": [{"id": CALENDAR_ID}],
-        }
-        events_result = service.freebusy().query(body=body).execute()
-        calendars = events_result.get("calendars", {})
-        busy_periods = calendars.get(CALENDAR_ID, {}).get("busy", [])
-
-        busy_times = []
-        for period in busy_periods:
-            start = dt.datetime.fromisoformat(period["start"].replace("Z", "+00:00"))
-            end = dt.datetime.fromisoformat(period["end"].replace("Z", "+00:00"))
-            # Remove timezone info for simplicity (or handle properly in production)
-            busy_times.append({
-                "start": start.replace(tzinfo=None),
-                "end": end.replace(tzinfo=None)
-            })
-        return busy_times
+        for i in range(0, len(calendar_ids), FREEBUSY_MAX_CALENDARS):
+            batch = calendar_ids[i:i + FREEBUSY_MAX_CALENDARS]
+            body = {
+                "timeMin": fetch_min.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "timeMax": fetch_max.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "items": [{"id": calendar_id} for calendar_id in batch],
+            }
+            events_result = service.freebusy().query(body=body).execute()
+            calendars = events_result.get("calendars", {})
+
+            for calendar_id in batch:
+                calendar = calendars.get(calendar_id, {})
+                calendar_busy = []
+                # Unreadable calendars report "errors"; cache them as free so
+                # they aren't re-queried every time
+                for period in ([] if calendar.get("errors") else calendar.get("busy", [])):
+                    # fromisoformat() only accepts a trailing "Z" from 3.11 on
+                    calendar_busy.append({
+                        "start": dt.datetime.fromisoformat(period["start"].replace("Z", "+00:00")),
+                        "end": dt.datetime.fromisoformat(period["end"].replace("Z", "+00:00")),
+                    })
+
+                key = (calendar_id, fetch_min, fetch_max)
+                _busy_cache[key] = (time.monotonic(), calendar_busy)
+                busy_times.extend(
+                    b for b in calendar_busy if b["start"] < utc_max and b["end"] > utc_min
+                )
     except HttpError:
-        return []
+        pass
+    return busy_times
+
+
+# How far ahead to speculatively fetch FreeBusy while the request is parsed.
+SPECULATIVE_BUSY_DAYS = 14
 
 
-def is_slot_free(slot_start: dt.datetime, slot_end: dt.datetime, busy_times: list[dict]) -> bool:
+def connect_calendar_and_prefetch():
     """
-    Check if a time slot overlaps with any busy periods.
-    Returns True if the slot is free.
+    Build the calendar service and warm the FreeBusy cache for the next
+    SPECULATIVE_BUSY_DAYS days. Meant to run in the background while Gemini
+    parses the request, since neither depends on the other.
     """
-    for busy in busy_times:
-        # Check for overlap: slot and busy period overlap if:
-        # slot_start < busy_end AND slot_end > busy_start
-        if slot_start < busy["end"] and slot_end > busy["start"]:
-            return False
-    return True
+    service = get_calendar_service()
+    if service:
+        now = dt.datetime.now(dt.timezone.utc)
+        # Best-effort: cancel and direct mode never need this, so a network
+        # or auth failure here must not take the run down with it
+        try:
+            get_busy_times(service, now, now + dt.timedelta(days=SPECULATIVE_BUSY_DAYS))
+        except Exception as e:
+            print(f"   ⚠ Could not prefetch busy times: {e}")
+    return service
+
+
+def merge_busy_times(busy_times: list[dict]) -> tuple[list[dt.datetime], list[dt.datetime]]:
+    """
+    Sort busy periods and coalesce overlapping ones.
+    Returns parallel (starts, ends) lists, both ascending, ready for bisect.
+    """
+    starts: list[dt.datetime] = []
+    ends: list[dt.datetime] = []
+    for busy in sorted(busy_times, key=lambda b: b["start"]):
+        if ends and busy["start"] <= ends[-1]:
+            ends[-1] = max(ends[-1], busy["end"])
+        else:
+            starts.append(busy["start"])
+            ends.append(busy["end"])
+    return starts, ends
+
+
+def find_conflict(slot_start: dt.datetime, slot_end: dt.datetime,
+                  busy_starts: list[dt.datetime], busy_ends: list[dt.datetime],
+                  lo: int = 0) -> int:
+    """
+    Return the index of the busy period overlapping the slot, or -1 if none.
+    Expects the merged lists from merge_busy_times(). Periods before `lo`
+    are known to end before the slot and are skipped.
+    """
+    # First busy period that ends after the slot starts; only it can overlap
+    idx = bisect.bisect_right(busy_ends, slot_start, lo)
+    if idx < len(busy_starts) and busy_starts[idx] < slot_end:
+        return idx
+    return -1
 
 
 def create_calendar_event(service, meeting: dict, start_time: dt.datetime, end_time: dt.datetime) -> dict | None:
@@ -279,28 +1084,23 @@ def create_calendar_event(service, meeting: dict, start_time: dt.datetime, end_t
         return None
     
     try:
+        time_zone = meeting.get("time_zone", DEFAULT_TIME_ZONE)
+        topic = meeting.get("topic") or ""
+        extra_context = meeting.get("extra_context") or ""
+        
         # Build attendee list
-        attendees = []
-        for att in meeting.get("attendees", []):
-            if att.get("email"):
-                attendees.append({"email": att["email"]})
+        attendees = [
+            {"email": att["email"]} for att in meeting.get("attendees", []) if att.get("email")
+        ]
         
         # Create event body
-        topic = meeting.get("topic") or ""
-        extra_context = meeting.get("extra_context") or ""
         description = (topic + ("\n\n" + extra_context if extra_context else "")).strip()
         
         event = {
             "summary": meeting.get("subject", "Meeting"),
             "description": description,
-            "start": {
-                "dateTime": start_time.isoformat(),
-                "timeZone": meeting.get("time_zone", DEFAULT_TIME_ZONE),
-            },
-            "end": {
-                "dateTime": end_time.isoformat(),
-                "timeZone": meeting.get("time_zone", DEFAULT_TIME_ZONE),
-            },
+            "start": {"dateTime": start_time.isoformat(), "timeZone": time_zone},
+            "end": {"dateTime": end_time.isoformat(), "timeZone": time_zone},
             "attendees": attendees,
             "reminders": {
                 "useDefault": True,
@@ -308,7 +1108,9 @@ def create_calendar_event(service, meeting: dict, start_time: dt.datetime, end_t
         }
         
         # Create the event
-        created_event = service.events().insert(calendarId=CALENDAR_ID, body=event).execute()
+        created_event = service.events().insert(
+            calendarId=CALENDAR_ID, body=event, sendUpdates=CALENDAR_SEND_UPDATES
+        ).execute()
         
         return {
             "id": created_event.get("id"),
@@ -323,7 +1125,45 @@ def create_calendar_event(service, meeting: dict, start_time: dt.datetime, end_t
         return None
 
 
-def search_events(service, criteria: dict, time_range_start: dt.datetime, time_range_end: dt.datetime) -> list[dict]:
+# Only the event fields search_events() and cancel mode read.
+SEARCH_EVENT_FIELDS = (
+    "nextPageToken,items(id,summary,start,end,attendees(email,displayName),organizer(email,displayName))"
+)
+
+
+def _parse_event_time(value: str) -> dt.datetime | None:
+    """
+    Naive local datetime for an event's start/end dateTime string, or None
+    for all-day dates (no 'T') and anything unparseable.
+    """
+    if 'T' not in value:
+        return None
+    try:
+        # fromisoformat() only accepts a trailing "Z" from 3.11 on
+        return dt.datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _display_name(attendee: dict) -> str:
+    """How a calendar attendee is shown: display name, else email."""
+    return attendee.get('displayName') or attendee.get('email') or 'Unknown'
+
+
+def _list_events(service, list_args: dict) -> list[dict]:
+    """All events for an events().list() query, following nextPageToken."""
+    events = []
+    while True:
+        events_result = service.events().list(**list_args).execute()
+        events.extend(events_result.get('items', []))
+        page_token = events_result.get('nextPageToken')
+        if not page_token:
+            return events
+        list_args = dict(list_args, pageToken=page_token)
+
+
+def search_events(service, criteria: dict, time_range_start: dt.datetime, time_range_end: dt.datetime,
+                  time_zone: str = DEFAULT_TIME_ZONE) -> list[dict]:
     """
     Search for calendar events matching the given criteria.
     
@@ -332,29 +1172,37 @@ def search_events(service, criteria: dict, time_range_start: dt.datetime, time_r
         criteria: Dict with search parameters (attendee_name, subject_keywords, etc.)
         time_range_start: Start of time range to search
         time_range_end: End of time range to search
+        time_zone: Zone of naive range bounds
     
     Returns:
-        List of matching events with details
+        List of matching events with details; '_start_dt' / '_end_dt' hold
+        the parsed times (None for all-day events)
     """
     if not service:
         return []
     
     try:
-        # Query calendar events in the time range
-        events_result = service.events().list(
+        attendee_name = (criteria.get("attendee_name") or "").lower()
+        subject_keywords = criteria.get("subject_keywords") or []
+        
+        # Query calendar events in the time range; a naive bound is wall-clock
+        # time in `time_zone`, so it must be converted rather than tagged "Z"
+        zone = _time_zone(time_zone)
+        list_args = dict(
             calendarId=CALENDAR_ID,
-            timeMin=time_range_start.isoformat() + 'Z',
-            timeMax=time_range_end.isoformat() + 'Z',
+            timeMin=_to_utc(time_range_start, zone).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            timeMax=_to_utc(time_range_end, zone).strftime("%Y-%m-%dT%H:%M:%SZ"),
             singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
+            orderBy='startTime',
+            fields=SEARCH_EVENT_FIELDS,
+        )
+        # No server-side q= search: it matches whole terms, while the checks
+        # below match substrings ("bob" in bobby@x.com), so it could silently
+        # drop events that 'a' (cancel all) should include
+        events = _list_events(service, list_args)
         
-        # Filter by criteria
+        # Apply the search criteria locally
         matching_events = []
-        attendee_name = (criteria.get("attendee_name") or "").lower()
-        subject_keywords = criteria.get("subject_keywords") or []
         
         for event in events:
             # Check attendee name match (only if attendee_name is specified)
@@ -392,11 +1240,15 @@ def search_events(service, criteria: dict, time_range_start: dt.datetime, time_r
                 subject_match = any(keyword.lower() in summary for keyword in subject_keywords)
             
             if attendee_match and subject_match:
+                start = event['start'].get('dateTime', event['start'].get('date'))
+                end = event['end'].get('dateTime', event['end'].get('date'))
                 matching_events.append({
                     'id': event['id'],
                     'summary': event.get('summary', 'No title'),
-                    'start': event['start'].get('dateTime', event['start'].get('date')),
-                    'end': event['end'].get('dateTime', event['end'].get('date')),
+                    'start': start,
+                    'end': end,
+                    '_start_dt': _parse_event_time(start),
+                    '_end_dt': _parse_event_time(end),
                     'attendees': event.get('attendees', []),
                     'raw_event': event
                 })
@@ -411,13 +1263,14 @@ def search_events(service, criteria: dict, time_range_start: dt.datetime, time_r
         return []
 
 
-def delete_calendar_event(service, event_id: str) -> bool:
+def delete_calendar_event(service, event_id: str, send_updates: str = CALENDAR_SEND_UPDATES) -> bool:
     """
     Delete a calendar event by ID.
     
     Args:
         service: Google Calendar API service object
         event_id: ID of the event to delete
+        send_updates: sendUpdates value, "all" to have Google notify attendees
     
     Returns:
         True if deleted successfully, False otherwise
@@ -426,7 +1279,9 @@ def delete_calendar_event(service, event_id: str) -> bool:
         return False
     
     try:
-        service.events().delete(calendarId=CALENDAR_ID, eventId=event_id).execute()
+        service.events().delete(
+            calendarId=CALENDAR_ID, eventId=event_id, sendUpdates=send_updates
+        ).execute()
         return True
     except HttpError as e:
         print(f"   ⚠ Failed to delete event: {e}")
@@ -436,6 +1291,51 @@ def delete_calendar_event(service, event_id: str) -> bool:
         return False
 
 
+# Google's limit on requests in one Calendar batch call.
+CALENDAR_BATCH_MAX_REQUESTS = 50
+
+
+def delete_calendar_events(service, event_ids: list[str],
+                           send_updates: str = CALENDAR_SEND_UPDATES) -> list[str]:
+    """
+    Delete several calendar events, sending the deletes as batch requests
+    (one HTTP round-trip per CALENDAR_BATCH_MAX_REQUESTS events).
+    `send_updates` is passed as sendUpdates, as in delete_calendar_event().
+    
+    Returns:
+        IDs of the events that were deleted
+    """
+    if not service:
+        return []
+    if len(event_ids) == 1:
+        return event_ids if delete_calendar_event(service, event_ids[0], send_updates) else []
+    
+    deleted = []
+    
+    def _collect(request_id, response, exception):
+        if exception is not None:
+            print(f"   ⚠ Failed to delete event: {exception}")
+        else:
+            deleted.append(request_id)
+    
+    try:
+        for i in range(0, len(event_ids), CALENDAR_BATCH_MAX_REQUESTS):
+            batch = service.new_batch_http_request(callback=_collect)
+            for event_id in event_ids[i:i + CALENDAR_BATCH_MAX_REQUESTS]:
+                batch.add(
+                    service.events().delete(
+                        calendarId=CALENDAR_ID, eventId=event_id, sendUpdates=send_updates
+                    ),
+                    request_id=event_id,
+                )
+            batch.execute()
+    except HttpError as e:
+        print(f"   ⚠ Failed to delete events: {e}")
+    except Exception as e:
+        print(f"   ⚠ Unexpected error deleting events: {e}")
+    return deleted
+
+
 
 
 
@@ -443,43 +1343,98 @@ def delete_calendar_event(service, event_id: str) -> bool:
 # 3. Agent: parse user instruction into structured meeting data
 # ---------------------------------------------------------------------------
 
-PARSE_PROMPT_TEMPLATE = """
+# Markers the parse call leaves in the emails it drafts, replaced locally with
+# the slots picked by pick_candidate_slots() and the created event's link.
+SLOTS_PLACEHOLDER = "[[TIME_SLOTS]]"
+EVENT_LINK_PLACEHOLDER = "[[EVENT_LINK]]"
+
+# Gemini structured-output schema for parse_meeting_request(). The server
+# guarantees the response matches it, so the reply is parsed with json.loads.
+_NULLABLE_STRING = {"type": "STRING", "nullable": True}
+_DATETIME_DESC = "ISO 8601 datetime without offset, e.g. '2025-11-24T09:00'"
+
+MEETING_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "subject": {"type": "STRING", "description": "Short email subject line for this meeting."},
+        "topic": {"type": "STRING", "description": "A brief description of the meeting topic."},
+        "attendees": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "name": {**_NULLABLE_STRING, "description": "Name if given, else null"},
+                    "email": {**_NULLABLE_STRING, "description": "Email if given, else null"},
+                },
+                "required": ["name", "email"],
+            },
+        },
+        "duration_minutes": {"type": "INTEGER"},
+        "time_zone": {"type": "STRING", "description": "IANA time zone, e.g. 'America/New_York'"},
+        "scheduling_mode": {"type": "STRING", "enum": ["direct", "proposal", "cancel"]},
+        "exact_time": {**_NULLABLE_STRING, "description": f"If mode=direct: {_DATETIME_DESC}, else null"},
+        "earliest_start": {"type": "STRING", "description": f"Earliest acceptable start: {_DATETIME_DESC}"},
+        "latest_end": {"type": "STRING", "description": f"Latest acceptable end: {_DATETIME_DESC}"},
+        "preferred_times_of_day": {
+            "type": "ARRAY",
+            "items": {"type": "STRING", "enum": ["morning", "afternoon", "evening"]},
+        },
+        "extra_context": {
+            "type": "STRING",
+            "description": "Any additional information that should be included in the email body.",
+        },
+        "proposal_email": {
+            **_NULLABLE_STRING,
+            "description": "If scheduling_mode is proposal, the full email body (see EMAIL DRAFTING), else null",
+        },
+        "confirmation_email": {
+            **_NULLABLE_STRING,
+            "description": "If scheduling_mode is direct, the full email body (see EMAIL DRAFTING), else null",
+        },
+        "cancel_criteria": {
+            "type": "OBJECT",
+            "properties": {
+                "attendee_name": {
+                    **_NULLABLE_STRING,
+                    "description": "Name of person if canceling meeting with them, else null",
+                },
+                "date_range_start": {
+                    **_NULLABLE_STRING,
+                    "description": f"Start of search range if canceling: {_DATETIME_DESC}, else null",
+                },
+                "date_range_end": {
+                    **_NULLABLE_STRING,
+                    "description": f"End of search range if canceling: {_DATETIME_DESC}, else null",
+                },
+                "subject_keywords": {
+                    "type": "ARRAY",
+                    "items": {"type": "STRING"},
+                    "description": "Keywords to match in subject if canceling, else empty list",
+                },
+            },
+            "required": ["attendee_name", "date_range_start", "date_range_end", "subject_keywords"],
+        },
+    },
+    "required": [
+        "subject", "topic", "attendees", "duration_minutes", "time_zone", "scheduling_mode",
+        "exact_time", "earliest_start", "latest_end", "preferred_times_of_day",
+        "extra_context", "proposal_email", "confirmation_email", "cancel_criteria",
+    ],
+}
+
+# The prompt is split into a static prefix (schema, rules, known contacts),
+# which is served from Gemini's context cache, and a small per-request suffix.
+PARSE_PROMPT_PREFIX_TEMPLATE = """
 You are an AI scheduling assistant.
 
 The user will describe a meeting they want to schedule in natural language.
-Extract the details and respond ONLY with valid JSON, no commentary.
-
-JSON schema (all keys required):
-
-{{
-  "subject": "Short email subject line for this meeting.",
-  "topic": "A brief description of the meeting topic.",
-  "attendees": [
-    {{
-      "name": "Name if given, else null",
-      "email": "email@example.com if given, else null"
-    }}
-  ],
-  "duration_minutes": 30,
-  "time_zone": "IANA time zone, e.g. 'America/New_York'",
-  "scheduling_mode": "direct" or "proposal" or "cancel",
-  "exact_time": "ISO 8601 datetime if mode=direct, e.g. '2025-11-24T14:00', else null",
-  "earliest_start": "ISO 8601 datetime for the earliest acceptable start, e.g. '2025-11-24T09:00'",
-  "latest_end": "ISO 8601 datetime for the latest acceptable end, e.g. '2025-11-28T17:00'",
-  "preferred_times_of_day": ["morning", "afternoon", "evening"],
-  "extra_context": "Any additional information that should be included in the email body.",
-  "cancel_criteria": {{
-    "attendee_name": "Name of person if canceling meeting with them, else null",
-    "date_range_start": "ISO 8601 datetime for start of search range if canceling, else null",
-    "date_range_end": "ISO 8601 datetime for end of search range if canceling, else null",
-    "subject_keywords": ["List of keywords to match in subject if canceling, else empty list"]
-  }}
-}}
+Extract the details into the JSON response schema. Every key must be present;
+use null (or an empty list) for anything that does not apply.
 
 Rules:
 - Use the time zone '{default_tz}' if the user doesn't specify one.
 - If the user mentions a relative window (e.g. "next week", "tomorrow afternoon"),
-  choose a reasonable concrete range starting from today's date: {today}.
+  choose a reasonable concrete range starting from today's date (given with the request).
 - Ensure earliest_start < latest_end.
 - If you are unsure about exact times, pick typical working hours:
   - morning: 09:00–12:00
@@ -498,47 +1453,247 @@ SCHEDULING MODE DETECTION (CRITICAL):
   (e.g., "next week", "tomorrow afternoon", "sometime next Monday", "between 2-4pm").
   In this case, set exact_time to null.
 
-IMPORTANT - Known Contacts:
-If the user mentions a person by name only (without an email), check if they match any of these saved contacts.
-If there's a match, use the saved email address. If not, set email to null.
+EMAIL DRAFTING (set proposal_email only in "proposal" mode and confirmation_email only
+in "direct" mode; otherwise set them to null):
+- Write a polite, concise email to the attendees.
+- IMPORTANT: Do NOT include "Subject:" or any email headers; start directly with the greeting.
+- Address the first attendee by their first name (e.g. "Hi Alice,"), or "Hi there," if unknown.
+- Briefly mention the purpose/topic if it's substantive, and any relevant extra context.
+- Keep it professional but warm and conversational.
+- Sign off with: "Best regards, {sender_name}"
+- Plain email text only, no JSON or technical formatting.
+
+proposal_email:
+- Get straight to the point - mention you're reaching out to schedule a meeting.
+- Do NOT invent time slots. Put the exact line {slots_placeholder} on its own line where the
+  bulleted list of options belongs; it will be replaced with the real free slots.
+- Clearly state that times are in the meeting's time zone.
+- Ask them to choose one option or propose an alternative.
+
+confirmation_email:
+- Get straight to the point - CONFIRM the meeting is scheduled at exact_time.
+- State the date, time, and duration naturally (don't list them as bullet points).
+- Put the exact text {event_link_placeholder} where the calendar event link belongs;
+  it will be replaced with the real link.
+- Let them know they can reach out if they need to reschedule.
+
+IMPORTANT - Known Contacts:
+If the user mentions a person by name only (without an email), check if they match any of these saved contacts.
+If there's a match, use the saved email address. If not, set email to null.
+
+Known contacts:
+{known_contacts}
+"""
+_PARSE_PROMPT_PREFIX_PARTS = compile_template(
+    PARSE_PROMPT_PREFIX_TEMPLATE,
+    default_tz=DEFAULT_TIME_ZONE,
+    slots_placeholder=SLOTS_PLACEHOLDER,
+    event_link_placeholder=EVENT_LINK_PLACEHOLDER,
+    sender_name=FROM_NAME,
+)
+
+PARSE_PROMPT_SUFFIX_TEMPLATE = """
+Today's date: {today}
+
+User request:
+\"\"\"{user_instruction}\"\"\"
+"""
+_PARSE_PROMPT_SUFFIX_PARTS = compile_template(PARSE_PROMPT_SUFFIX_TEMPLATE)
+
+
+class ParseCache:
+    """
+    On-disk (SQLite) cache of parse_meeting_request() results.
+
+    Exact repeats of an instruction are found by SHA-256 of its normalized
+    text. If PARSE_CACHE_SIMILARITY is set, near-repeats are also found by
+    cosine similarity of Gemini embeddings. Entries are scoped to today's
+    date and the rendered prompt prefix, since relative dates ("tomorrow")
+    and the known contacts change the answer.
+    """
+    def __init__(self, filepath: str = PARSE_CACHE_FILE, similarity: float = PARSE_CACHE_SIMILARITY):
+        self.similarity = similarity
+        self.conn = sqlite3.connect(filepath, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS parse_cache ("
+            "key TEXT PRIMARY KEY, scope TEXT NOT NULL, instruction TEXT NOT NULL, "
+            "embedding BLOB, response_json TEXT NOT NULL, ts REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS parse_cache_scope ON parse_cache (scope)")
+        # Entries from earlier days can never match again
+        with self.conn:
+            self.conn.execute("DELETE FROM parse_cache WHERE ts < ?", (time.time() - 86400,))
+
+    @staticmethod
+    def _normalize(instruction: str) -> str:
+        return " ".join(instruction.lower().split())
+
+    def _key(self, scope: str, instruction: str) -> str:
+        text = f"{scope}\0{self._normalize(instruction)}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _embed(self, instruction: str) -> array | None:
+        """Unit-length embedding of the instruction, or None if unavailable."""
+        try:
+            result = client.models.embed_content(
+                model=EMBEDDING_MODEL, contents=self._normalize(instruction)
+            )
+        except genai_errors.APIError:
+            return None
+        values = result.embeddings[0].values
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return array("f", (v / norm for v in values))
+
+    def lookup(self, scope: str, instruction: str) -> tuple[dict | None, array | None]:
+        """
+        Return (cached result or None, embedding computed along the way).
+        Pass the embedding back to store() to avoid embedding twice.
+        """
+        row = self.conn.execute(
+            "SELECT response_json FROM parse_cache WHERE key = ?", (self._key(scope, instruction),)
+        ).fetchone()
+        if row:
+            return json.loads(row[0]), None
+
+        if not self.similarity:
+            return None, None
+        embedding = self._embed(instruction)
+        if embedding is None:
+            return None, None
+
+        best_score, best_json = self.similarity, None
+        rows = self.conn.execute(
+            "SELECT embedding, response_json FROM parse_cache "
+            "WHERE scope = ? AND embedding IS NOT NULL", (scope,)
+        )
+        for blob, response_json in rows:
+            stored = array("f")
+            stored.frombytes(blob)
+            score = sum(a * b for a, b in zip(embedding, stored))
+            if score >= best_score:
+                best_score, best_json = score, response_json
+        return (json.loads(best_json) if best_json else None), embedding
+
+    def discard(self, scope: str, instruction: str) -> None:
+        """Remove a stored result, e.g. a parse the user rejected."""
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM parse_cache WHERE key = ?", (self._key(scope, instruction),)
+            )
+
+    def store(self, scope: str, instruction: str, response: dict,
+              embedding: array | None = None) -> None:
+        """Save a parse result for later lookups."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO parse_cache "
+                "(key, scope, instruction, embedding, response_json, ts) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self._key(scope, instruction),
+                    scope,
+                    instruction,
+                    embedding.tobytes() if embedding is not None else None,
+                    json.dumps(response),
+                    time.time(),
+                ),
+            )
+
+
+_parse_cache: ParseCache | None = None
+
+
+def get_parse_cache() -> ParseCache | None:
+    """
+    Return the process-wide parse cache, opening it on first use, or None
+    when PARSE_CACHE_FILE is empty (caching disabled).
+    """
+    global _parse_cache
+    if _parse_cache is None and PARSE_CACHE_FILE:
+        _parse_cache = ParseCache()
+    return _parse_cache
+
 
-Known contacts:
-{known_contacts}
+# Key of the last parse_meeting_request() result, so a run the user aborts
+# can drop it again with discard_last_parse().
+_last_parse: tuple[str, str] | None = None
 
-User request:
-\"\"\"{user_instruction}\"\"\"
-"""
+
+@functools.lru_cache(maxsize=8)
+def _render_parse_prefix(known_contacts: str) -> tuple[str, str]:
+    """
+    Rendered parse prompt prefix and its SHA-256 hex digest. Cached per
+    contacts text, which ContactMemory itself only rebuilds after a change.
+    """
+    prefix = render_template(_PARSE_PROMPT_PREFIX_PARTS, dict(known_contacts=known_contacts))
+    return prefix, hashlib.sha256(prefix.encode("utf-8")).hexdigest()
 
 
 def parse_meeting_request(user_instruction: str, contacts: ContactMemory) -> dict:
     """
     Ask Gemini to turn the natural-language user instruction into structured JSON.
     Uses contact memory to auto-fill known email addresses.
+
+    In proposal and direct mode the same call also drafts the email body
+    ("proposal_email" / "confirmation_email"), saving a second round-trip;
+    see fill_proposal_email() and fill_confirmation_email().
+
+    Results are cached on disk (see ParseCache), so repeating an
+    instruction skips Gemini entirely.
     """
+    global _last_parse
     today = dt.date.today().isoformat()
-    known_contacts = contacts.get_all_contacts_text()
-
-    prompt = PARSE_PROMPT_TEMPLATE.format(
+    prefix, prefix_hash = _render_parse_prefix(contacts.get_all_contacts_text())
+    suffix = render_template(_PARSE_PROMPT_SUFFIX_PARTS, dict(
         user_instruction=user_instruction,
         today=today,
-        default_tz=DEFAULT_TIME_ZONE,
-        known_contacts=known_contacts,
-    )
-
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
+    ))
+
+    cache = get_parse_cache()
+    scope = f"{today}:{prefix_hash}"
+    _last_parse = (scope, user_instruction)
+    embedding = None
+    if cache is not None:
+        cached, embedding = cache.lookup(scope, user_instruction)
+        if cached is not None:
+            return cached
+
+    response = generate_with_prefix(
+        "parse", prefix, suffix,
+        config={"response_mime_type": "application/json", "response_schema": MEETING_SCHEMA},
     )
     text = response.text
-    data = extract_json_from_text(text)
+    try:
+        data = json_loads(text)
+    except json.JSONDecodeError:
+        data = extract_json_from_text(text)
+    if cache is not None:
+        cache.store(scope, user_instruction, data, embedding)
     return data
 
 
+def discard_last_parse() -> None:
+    """
+    Drop the last parse result from the cache, so re-running an instruction
+    the user aborted (perhaps because it was mis-parsed) asks Gemini again.
+    """
+    cache = get_parse_cache()
+    if cache is not None and _last_parse is not None:
+        cache.discard(*_last_parse)
+
+
 # ---------------------------------------------------------------------------
 # 4. Agent: pick candidate time slots
 # ---------------------------------------------------------------------------
 
-def pick_candidate_slots(meeting: dict, calendar_service=None, max_slots: int = 3) -> list[dict]:
+# Simple hour windows for each time of day
+TIME_BLOCKS = {
+    "morning": (9, 12),      # 09:00–12:00
+    "afternoon": (13, 17),   # 13:00–17:00
+    "evening": (17, 20),     # 17:00–20:00
+}
+
+
+def pick_candidate_slots(meeting: dict, calendar_service=None, max_slots: int = 3) -> list[dict[str, dt.datetime]]:
     """
     Given structured meeting data, pick 2–3 candidate time slots.
 
@@ -548,9 +1703,11 @@ def pick_candidate_slots(meeting: dict, calendar_service=None, max_slots: int =
 
     Each slot dict:
     {
-      "start": "ISO datetime string",
-      "end": "ISO datetime string"
+      "start": datetime,
+      "end": datetime
     }
+    Slots stay as datetimes and are only rendered to text when formatted
+    for a prompt, email, or log.
     """
     duration_minutes = int(meeting.get("duration_minutes", 30))
     duration = dt.timedelta(minutes=duration_minutes)
@@ -560,36 +1717,49 @@ def pick_candidate_slots(meeting: dict, calendar_service=None, max_slots: int =
     preferred = meeting.get("preferred_times_of_day") or ["morning", "afternoon"]
 
     # Get busy times from calendar if available
-    busy_times = []
+    busy_starts: list[dt.datetime] = []
+    busy_ends: list[dt.datetime] = []
     if calendar_service:
         print("  → Checking Google Calendar for availability...")
-        busy_times = get_busy_times(calendar_service, earliest_start, latest_end)
-        if busy_times:
-            print(f"  → Found {len(busy_times)} busy period(s)")
+        # Attendee emails double as calendar IDs within a Workspace org
+        calendar_ids = [CALENDAR_ID] + [
+            att["email"] for att in meeting.get("attendees", []) if att.get("email")
+        ]
+        busy_starts, busy_ends = get_busy_times(
+            calendar_service, earliest_start, latest_end, calendar_ids,
+            meeting.get("time_zone") or DEFAULT_TIME_ZONE,
+        )
+        if busy_starts:
+            print(f"  → Found {len(busy_starts)} busy period(s)")
         else:
             print("  → No conflicts found in calendar")
 
     slots: list[dict] = []
 
-    # Define simple hour windows
-    time_blocks = {
-        "morning": (9, 12),      # 09:00–12:00
-        "afternoon": (13, 17),   # 13:00–17:00
-        "evening": (17, 20),     # 17:00–20:00
-    }
+    # Offset of each preferred block's start from midnight, resolved once
+    # up front rather than per day
+    block_offsets = [
+        dt.timedelta(hours=TIME_BLOCKS[tod][0]) for tod in preferred if tod in TIME_BLOCKS
+    ]
+    one_day = dt.timedelta(days=1)
 
-    # Iterate day by day between earliest_start.date and latest_end.date
-    current_day = earliest_start.date()
-    last_day = latest_end.date()
+    # Iterate day by day (as midnights) between earliest_start.date and latest_end.date
+    current_day = dt.datetime.combine(earliest_start.date(), dt.time())
+    last_day = dt.datetime.combine(latest_end.date(), dt.time())
+
+    # Sweep pointer: busy periods before it end before the current day, so
+    # they can't conflict with this or any later day's candidates. Days only
+    # move forward, so find_conflict() searches only the periods still ahead.
+    first_busy = 0
 
     while current_day <= last_day and len(slots) < max_slots:
-        for tod in preferred:
-            if tod not in time_blocks:
-                continue
-            start_hour, end_hour = time_blocks[tod]
+        while first_busy < len(busy_ends) and busy_ends[first_busy] <= current_day:
+            first_busy += 1
 
+        blocked_until = None
+        for offset in block_offsets:
             # Candidate start at the block's start, within earliest/latest
-            candidate_start = dt.datetime.combine(current_day, dt.time(start_hour, 0))
+            candidate_start = current_day + offset
             candidate_end = candidate_start + duration
 
             # Ensure candidate is within the global window
@@ -599,19 +1769,22 @@ def pick_candidate_slots(meeting: dict, calendar_service=None, max_slots: int =
                 continue
 
             # Check if slot is free (if calendar available)
-            if busy_times and not is_slot_free(candidate_start, candidate_end, busy_times):
+            conflict = find_conflict(candidate_start, candidate_end, busy_starts, busy_ends, first_busy)
+            if conflict >= 0:
+                if blocked_until is None or busy_ends[conflict] > blocked_until:
+                    blocked_until = busy_ends[conflict]
                 continue
 
-            slots.append(
-                {
-                    "start": candidate_start.isoformat(timespec="minutes"),
-                    "end": candidate_end.isoformat(timespec="minutes"),
-                }
-            )
+            slots.append({"start": candidate_start, "end": candidate_end})
             if len(slots) >= max_slots:
                 break
 
-        current_day += dt.timedelta(days=1)
+        # A busy period running past today covers every day up to its end,
+        # so jump straight there instead of re-testing those days.
+        if blocked_until and blocked_until.date() > current_day.date():
+            current_day = dt.datetime.combine(blocked_until.date(), dt.time())
+        else:
+            current_day += one_day
 
     return slots
 
@@ -620,10 +1793,30 @@ def pick_candidate_slots(meeting: dict, calendar_service=None, max_slots: int =
 # 5. Agent: draft the email text with Gemini
 # ---------------------------------------------------------------------------
 
-EMAIL_PROMPT_TEMPLATE = """
+# Drafting prompts are split like the parse prompt: a static instruction
+# prefix (rendered once, eligible for context caching) and a per-call suffix.
+EMAIL_PROMPT_PREFIX_TEMPLATE = """
 You are an AI meeting scheduling assistant.
 
-Write a polite, concise email to schedule a meeting using the details below.
+Write a polite, concise email to schedule a meeting using the details given after these requirements.
+
+Requirements for the email:
+- IMPORTANT: Do NOT include "Subject:" or any email headers in the body text.
+- The email body should start directly with the greeting.
+- Address the recipient by their first name in the greeting (e.g., "Hi Alice,"),
+  using the recipient first name given below.
+- Get straight to the point - mention you're reaching out to schedule a meeting.
+- Briefly mention the purpose/topic if provided.
+- Present the candidate time slots as a bulleted list.
+- Clearly state the time zone the times are in.
+- Ask them to choose one option or propose an alternative.
+- Keep it professional but warm and conversational.
+- Sign off with: "Best regards, {sender_name}"
+- Do NOT include any JSON or technical formatting, just plain email text.
+"""
+
+EMAIL_PROMPT_SUFFIX_TEMPLATE = """
+Recipient first name: {recipient_name}
 
 Meeting:
 - Subject: {subject}
@@ -638,88 +1831,112 @@ Attendees (may be empty or missing names):
 
 Extra context from the user:
 \"\"\"{extra_context}\"\"\"
-
-
-Requirements for the email:
-- IMPORTANT: Do NOT include "Subject:" or any email headers in the body text.
-- The email body should start directly with the greeting.
-- Address the recipient by their first name in the greeting (e.g., "Hi {recipient_name},").
-- Get straight to the point - mention you're reaching out to schedule a meeting.
-- Briefly mention the purpose/topic if provided.
-- Present the candidate time slots as a bulleted list.
-- Clearly state that times are in {time_zone}.
-- Ask them to choose one option or propose an alternative.
-- Keep it professional but warm and conversational.
-- Sign off with: "Best regards, {sender_name}"
-- Do NOT include any JSON or technical formatting, just plain email text.
 """
+_EMAIL_PROMPT_PREFIX = render_template(
+    compile_template(EMAIL_PROMPT_PREFIX_TEMPLATE, sender_name=FROM_NAME), {}
+)
+_EMAIL_PROMPT_SUFFIX_PARTS = compile_template(EMAIL_PROMPT_SUFFIX_TEMPLATE)
+
+
+def format_slots_for_prompt(slots: list[dict[str, dt.datetime]], time_zone: str) -> str:
+    return _format_slots(tuple((s["start"], s["end"]) for s in slots), time_zone)
+
+
+@functools.lru_cache(maxsize=256)
+def _format_slots(slots: tuple[tuple[dt.datetime, dt.datetime], ...], time_zone: str) -> str:
+    """Cached body of format_slots_for_prompt(), keyed by (start, end) pairs."""
+    if not slots:
+        return "- (No slots found, but suggest that in the email.)"
+    # For simplicity, we don't convert time zones here; we just label.
+    return "\n".join(
+        f"- {start.strftime('%a, %b %d')}, "
+        f"{start.strftime('%H:%M')}–{end.strftime('%H:%M')} ({time_zone})"
+        for start, end in slots
+    )
 
 
-def format_slots_for_prompt(slots: list[dict], time_zone: str) -> str:
-    lines = []
-    for s in slots:
-        start = dt.datetime.fromisoformat(s["start"])
-        end = dt.datetime.fromisoformat(s["end"])
-        # For simplicity, we don't convert time zones here; we just label.
-        date_str = start.strftime("%a, %b %d")
-        time_str = f"{start.strftime('%H:%M')}–{end.strftime('%H:%M')}"
-        lines.append(f"- {date_str}, {time_str} ({time_zone})")
-    return "\n".join(lines) if lines else "- (No slots found, but suggest that in the email.)"
+def format_attendees_for_prompt(attendees: list[dict]) -> str:
+    return _format_attendees(tuple((a.get("name"), a.get("email")) for a in attendees))
 
 
-def format_attendees_for_prompt(attendees: list[dict]) -> str:
+@functools.lru_cache(maxsize=256)
+def _format_attendees(attendees: tuple[tuple[str | None, str | None], ...]) -> str:
+    """Cached body of format_attendees_for_prompt(), keyed by (name, email) pairs."""
     if not attendees:
         return "- (No attendees specified.)"
-    lines = []
-    for a in attendees:
-        name = a.get("name") or "Unknown"
-        email = a.get("email") or "unknown"
-        lines.append(f"- {name} <{email}>")
-    return "\n".join(lines)
+    return "\n".join(
+        f"- {name or 'Unknown'} <{email or 'unknown'}>" for name, email in attendees
+    )
+
+
+def fill_proposal_email(meeting: dict, slots: list[dict]) -> str | None:
+    """
+    Insert the picked slots into the proposal email drafted by the parse call.
+    Returns None when there is no usable draft (or no slots), in which case
+    the caller should fall back to draft_email().
+    """
+    body = meeting.get("proposal_email")
+    if not body or not slots or SLOTS_PLACEHOLDER not in body:
+        return None
+    slot_lines = format_slots_for_prompt(slots, meeting["time_zone"])
+    return body.replace(SLOTS_PLACEHOLDER, slot_lines).strip()
 
 
 def draft_email(meeting: dict, slots: list[dict]) -> str:
     """
     Ask Gemini to draft the actual email body.
     """
-    slot_lines = format_slots_for_prompt(slots, meeting["time_zone"])
-    attendee_lines = format_attendees_for_prompt(meeting.get("attendees", []))
+    time_zone = meeting["time_zone"]
+    attendees = meeting.get("attendees") or []
+    slot_lines = format_slots_for_prompt(slots, time_zone)
+    attendee_lines = format_attendees_for_prompt(attendees)
     
-    # Get first attendee name for greeting
+    # Get first attendee name for greeting (first name only)
     recipient_name = "there"
-    attendees = meeting.get("attendees", [])
     if attendees and attendees[0].get("name"):
-        # Use first name only
-        full_name = attendees[0]["name"]
-        recipient_name = full_name.split()[0] if full_name else "there"
+        recipient_name = attendees[0]["name"].split()[0]
 
-    prompt = EMAIL_PROMPT_TEMPLATE.format(
+    suffix = render_template(_EMAIL_PROMPT_SUFFIX_PARTS, dict(
         subject=meeting["subject"],
         topic=meeting["topic"],
         duration_minutes=meeting["duration_minutes"],
-        time_zone=meeting["time_zone"],
+        time_zone=time_zone,
         slot_lines=slot_lines,
         attendee_lines=attendee_lines,
         extra_context=meeting.get("extra_context", ""),
         recipient_name=recipient_name,
-        sender_name=FROM_NAME,
-    )
+    ))
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
-    )
-    return response.text.strip()
+    return generate_text("proposal", _EMAIL_PROMPT_PREFIX, suffix)
 
 
 # ---------------------------------------------------------------------------
 # 5b. Confirmation email for direct scheduling
 # ---------------------------------------------------------------------------
 
-CONFIRMATION_EMAIL_TEMPLATE = """
+CONFIRMATION_EMAIL_PREFIX_TEMPLATE = """
 You are an AI meeting scheduling assistant.
 
-Write a polite, concise CONFIRMATION email for a meeting that has already been scheduled.
+Write a polite, concise CONFIRMATION email for a meeting that has already been scheduled,
+using the details given after these requirements.
+
+Requirements for the email:
+- IMPORTANT: Do NOT include "Subject:" or any email headers in the body text.
+- The email body should start directly with the greeting.
+- Address the recipient by their first name in the greeting (e.g., "Hi Alice,"),
+  using the recipient first name given below.
+- Get straight to the point - CONFIRM the meeting is scheduled.
+- State the date, time, and duration naturally (don't list them as bullet points).
+- Include the calendar event link in a natural way.
+- Briefly mention the topic/purpose if it's substantive (skip if generic like "discussion").
+- Let them know they can reach out if they need to reschedule.
+- Keep it professional but warm and conversational.
+- Sign off with: "Best regards, {sender_name}"
+- Do NOT include any JSON or technical formatting, just plain email text.
+"""
+
+CONFIRMATION_EMAIL_SUFFIX_TEMPLATE = """
+Recipient first name: {recipient_name}
 
 Meeting details:
 - Subject: {subject}
@@ -734,27 +1951,52 @@ Attendees:
 
 Extra context from the user:
 \"\"\"{extra_context}\"\"\"
-
-Requirements for the email:
-- IMPORTANT: Do NOT include "Subject:" or any email headers in the body text.
-- The email body should start directly with the greeting.
-- Address the recipient by their first name in the greeting (e.g., "Hi {recipient_name},").
-- Get straight to the point - CONFIRM the meeting is scheduled.
-- State the date, time, and duration naturally (don't list them as bullet points).
-- Include the calendar event link in a natural way.
-- Briefly mention the topic/purpose if it's substantive (skip if generic like "discussion").
-- Let them know they can reach out if they need to reschedule.
-- Keep it professional but warm and conversational.
-- Sign off with: "Best regards, {sender_name}"
-- Do NOT include any JSON or technical formatting, just plain email text.
 """
+_CONFIRMATION_EMAIL_PREFIX = render_template(
+    compile_template(CONFIRMATION_EMAIL_PREFIX_TEMPLATE, sender_name=FROM_NAME), {}
+)
+_CONFIRMATION_EMAIL_SUFFIX_PARTS = compile_template(CONFIRMATION_EMAIL_SUFFIX_TEMPLATE)
+
+# With no extra context there is nothing for Gemini to word around, so the
+# confirmation is filled in locally unless LLM_CONFIRMATION_EMAILS=1.
+LLM_CONFIRMATION_EMAILS = os.getenv("LLM_CONFIRMATION_EMAILS") == "1"
+
+CONFIRMATION_EMAIL_TEXT_TEMPLATE = """Hi {recipient_name},
+
+This confirms that "{subject}" is scheduled for {date_time_str} ({time_zone}), for {duration_minutes} minutes.
+
+Here is the calendar event: {event_link}
+
+If you need to reschedule, just let me know.
+
+Best regards,
+{sender_name}"""
+_CONFIRMATION_EMAIL_TEXT_PARTS = compile_template(
+    CONFIRMATION_EMAIL_TEXT_TEMPLATE, sender_name=FROM_NAME
+)
+
+
+def fill_confirmation_email(meeting: dict, event_details: dict) -> str | None:
+    """
+    Insert the created event's link into the confirmation email drafted by
+    the parse call. Returns None when there is no usable draft (or link), in
+    which case the caller should fall back to draft_confirmation_email().
+    """
+    body = meeting.get("confirmation_email")
+    link = event_details.get("link") if event_details else None
+    if not body or not link or EVENT_LINK_PLACEHOLDER not in body:
+        return None
+    return body.replace(EVENT_LINK_PLACEHOLDER, link).strip()
 
 
 def draft_confirmation_email(meeting: dict, event_details: dict, start_time: dt.datetime, end_time: dt.datetime) -> str:
     """
-    Ask Gemini to draft a confirmation email for a scheduled meeting.
+    Draft a confirmation email for a scheduled meeting: with Gemini when
+    there is extra context to work in (or LLM_CONFIRMATION_EMAILS is set),
+    otherwise from CONFIRMATION_EMAIL_TEXT_TEMPLATE.
     """
-    attendee_lines = format_attendees_for_prompt(meeting.get("attendees", []))
+    attendees = meeting.get("attendees") or []
+    extra_context = meeting.get("extra_context", "")
     
     # Format the date/time nicely
     date_str = start_time.strftime("%A, %B %d, %Y")
@@ -763,31 +2005,34 @@ def draft_confirmation_email(meeting: dict, event_details: dict, start_time: dt.
     
     event_link = event_details.get("link", "N/A") if event_details else "N/A"
     
-    # Get first attendee name for greeting
+    # Get first attendee name for greeting (first name only)
     recipient_name = "there"
-    attendees = meeting.get("attendees", [])
     if attendees and attendees[0].get("name"):
-        full_name = attendees[0]["name"]
-        recipient_name = full_name.split()[0] if full_name else "there"
+        recipient_name = attendees[0]["name"].split()[0]
     
-    prompt = CONFIRMATION_EMAIL_TEMPLATE.format(
+    if not extra_context and not LLM_CONFIRMATION_EMAILS:
+        return render_template(_CONFIRMATION_EMAIL_TEXT_PARTS, dict(
+            recipient_name=recipient_name,
+            subject=meeting["subject"],
+            date_time_str=date_time_str,
+            time_zone=meeting["time_zone"],
+            duration_minutes=meeting["duration_minutes"],
+            event_link=event_link,
+        ))
+    
+    suffix = render_template(_CONFIRMATION_EMAIL_SUFFIX_PARTS, dict(
         subject=meeting["subject"],
         topic=meeting["topic"],
         date_time_str=date_time_str,
         duration_minutes=meeting["duration_minutes"],
         time_zone=meeting["time_zone"],
         event_link=event_link,
-        attendee_lines=attendee_lines,
-        extra_context=meeting.get("extra_context", ""),
+        attendee_lines=format_attendees_for_prompt(attendees),
+        extra_context=extra_context,
         recipient_name=recipient_name,
-        sender_name=FROM_NAME,
-    )
+    ))
     
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
-    )
-    return response.text.strip()
+    return generate_text("confirmation", _CONFIRMATION_EMAIL_PREFIX, suffix)
 
 
 
@@ -795,23 +2040,17 @@ def draft_confirmation_email(meeting: dict, event_details: dict, start_time: dt.
 # 5c. Cancellation email for cancel mode
 # ---------------------------------------------------------------------------
 
-CANCELLATION_EMAIL_TEMPLATE = """
+CANCELLATION_EMAIL_PREFIX_TEMPLATE = """
 You are an AI meeting scheduling assistant.
 
-Write a polite, concise CANCELLATION email for a meeting that needs to be cancelled.
-
-Meeting details being cancelled:
-- Subject: {subject}
-- Date and time: {date_time_str}
-- Duration: {duration_minutes} minutes
-
-Attendees:
-{attendee_lines}
+Write a polite, concise CANCELLATION email for a meeting that needs to be cancelled,
+using the details given after these requirements.
 
 Requirements for the email:
 - IMPORTANT: Do NOT include "Subject:" or any email headers in the body text.
 - The email body should start directly with the greeting.
-- Address the recipient by their first name in the greeting (e.g., "Hi {recipient_name},").
+- Address the recipient by their first name in the greeting (e.g., "Hi Alice,"),
+  using the recipient first name given below.
 - Get straight to the point - CLEARLY state the specific meeting is CANCELLED.
 - State which meeting (date, time) in a natural, conversational way.
 - Apologize for any inconvenience.
@@ -821,134 +2060,445 @@ Requirements for the email:
 - Do NOT include any JSON or technical formatting, just plain email text.
 """
 
+CANCELLATION_EMAIL_SUFFIX_TEMPLATE = """
+Recipient first name: {recipient_name}
 
-def draft_cancellation_email(event: dict) -> str:
+Meeting details being cancelled:
+- Subject: {subject}
+- Date and time: {date_time_str}
+- Duration: {duration_minutes} minutes
+
+Attendees:
+{attendee_lines}
+"""
+_CANCELLATION_EMAIL_PREFIX = render_template(
+    compile_template(CANCELLATION_EMAIL_PREFIX_TEMPLATE, sender_name=FROM_NAME), {}
+)
+_CANCELLATION_EMAIL_SUFFIX_PARTS = compile_template(CANCELLATION_EMAIL_SUFFIX_TEMPLATE)
+
+# Cancellation notices are fixed text, so they are filled in locally unless
+# LLM_CANCEL_EMAILS=1 asks for Gemini-drafted ones.
+LLM_CANCEL_EMAILS = os.getenv("LLM_CANCEL_EMAILS") == "1"
+
+CANCELLATION_EMAIL_TEXT_TEMPLATE = """Hi {recipient_name},
+
+I'm writing to let you know that our meeting "{subject}" on {date_time_str} has been cancelled.
+
+Sorry for any inconvenience. If you'd still like to meet, just reply and we can find another time.
+
+Best regards,
+{sender_name}"""
+_CANCELLATION_EMAIL_TEXT_PARTS = compile_template(
+    CANCELLATION_EMAIL_TEXT_TEMPLATE, sender_name=FROM_NAME
+)
+
+
+def _greeting_name(attendee: dict) -> str:
+    """First name from the attendee's display name, else their email user."""
+    display_name = (attendee.get('displayName') or '').split()
+    if display_name:
+        return display_name[0]
+    email = attendee.get('email') or ''
+    return email.split('@')[0] if '@' in email else "there"
+
+
+def _summarize_attendees(attendees: list[dict]) -> tuple[str, list[tuple[str, str]]]:
     """
-    Ask Gemini to draft a cancellation email for a deleted meeting.
+    One pass over a calendar event's attendees, returning the prompt's
+    attendee lines and (email, greeting name) for each attendee with an
+    email address.
     """
+    lines = []
+    recipients = []
+    for att in attendees:
+        lines.append(f"- {_display_name(att)}")
+        email = att.get('email')
+        if email:
+            recipients.append((email, _greeting_name(att)))
+    return "\n".join(lines) or "- (No other attendees)", recipients
+
+
+def _cancellation_fields(event: dict) -> dict:
+    """Template fields describing a deleted event, for either email template."""
     # Extract event details
     summary = event.get('summary', 'Meeting')
     start_str = event.get('start', '')
-    end_str = event.get('end', '')
     
-    # Parse start/end times
-    try:
-        if 'T' in start_str:
-            start_time = dt.datetime.fromisoformat(start_str.replace('Z', '+00:00'))
-            end_time = dt.datetime.fromisoformat(end_str.replace('Z', '+00:00'))
-            start_time = start_time.replace(tzinfo=None)
-            end_time = end_time.replace(tzinfo=None)
-            
-            date_str = start_time.strftime("%A, %B %d, %Y")
-            time_str = f"{start_time.strftime('%I:%M %p')}–{end_time.strftime('%I:%M %p')}"
-            date_time_str = f"{date_str} at {time_str}"
-            duration_minutes = int((end_time - start_time).total_seconds() / 60)
-        else:
-            # All-day event
-            date_time_str = start_str
-            duration_minutes = "all-day"
-    except:
-        date_time_str = f"{start_str}"
+    # Start/end times were parsed by search_events()
+    start_time = event.get('_start_dt')
+    end_time = event.get('_end_dt')
+    if start_time and end_time:
+        date_str = start_time.strftime("%A, %B %d, %Y")
+        time_str = f"{start_time.strftime('%I:%M %p')}–{end_time.strftime('%I:%M %p')}"
+        date_time_str = f"{date_str} at {time_str}"
+        duration_minutes = int((end_time - start_time).total_seconds() / 60)
+    elif 'T' not in start_str:
+        # All-day event
+        date_time_str = start_str
+        duration_minutes = "all-day"
+    else:
+        date_time_str = start_str
         duration_minutes = "unknown"
     
-    # Format attendees
-    attendees = event.get('attendees', [])
-    if attendees:
-        attendee_lines = "\n".join([
-            f"- {att.get('displayName', att.get('email', 'Unknown'))}"
-            for att in attendees
-        ])
-    else:
-        attendee_lines = "- (No other attendees)"
+    attendee_lines, recipients = _summarize_attendees(event.get('attendees', []))
     
-    # Get first attendee name for greeting
-    recipient_name = "there"
-    if attendees and attendees[0]:
-        display_name = attendees[0].get('displayName', '')
-        if display_name:
-            recipient_name = display_name.split()[0]
-        else:
-            email = attendees[0].get('email', '')
-            recipient_name = email.split('@')[0] if '@' in email else "there"
+    # A draft shared by several recipients can't greet any one of them
+    recipient_name = recipients[0][1] if len(recipients) == 1 else "all" if recipients else "there"
     
-    prompt = CANCELLATION_EMAIL_TEMPLATE.format(
+    return dict(
         subject=summary,
         date_time_str=date_time_str,
         duration_minutes=duration_minutes,
-        attendee_lines=attendee_lines,
         recipient_name=recipient_name,
-        sender_name=FROM_NAME,
-    )
-    
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
+        attendee_lines=attendee_lines,
+        recipients=recipients,
     )
-    return response.text.strip()
 
 
+def draft_cancellation_email(event: dict) -> str:
+    """
+    Write the cancellation email for a deleted meeting, from
+    CANCELLATION_EMAIL_TEXT_TEMPLATE or, with LLM_CANCEL_EMAILS, with Gemini.
+    Returns the body for the first recipient; use draft_cancellation_emails()
+    for one personalized body per recipient.
+    """
+    fields = _cancellation_fields(event)
+    emails = draft_cancellation_emails([event], [fields])[0]
+    if emails:
+        return emails[0][1]
+    return render_template(_CANCELLATION_EMAIL_TEXT_PARTS, fields)
+
+
+def draft_cancellation_emails(events: list[dict],
+                              all_fields: list[dict] | None = None) -> list[list[tuple[str, str]]]:
+    """
+    Write cancellation emails for several deleted events, in event order,
+    as (recipient email, body) pairs per event. The template is filled in
+    per recipient, greeting each by name; with LLM_CANCEL_EMAILS one draft
+    per event (drafted concurrently, see generate_many()) goes to all of
+    its recipients. Pass `all_fields` when the events'
+    _cancellation_fields() were already computed.
+    """
+    if all_fields is None:
+        all_fields = [_cancellation_fields(event) for event in events]
+    if not LLM_CANCEL_EMAILS:
+        return [
+            [(email, render_template(_CANCELLATION_EMAIL_TEXT_PARTS, dict(fields, recipient_name=name)))
+             for email, name in fields["recipients"]]
+            for fields in all_fields
+        ]
+
+    suffixes = [render_template(_CANCELLATION_EMAIL_SUFFIX_PARTS, fields) for fields in all_fields]
+    bodies = generate_many("cancellation", _CANCELLATION_EMAIL_PREFIX, suffixes)
+    return [
+        [(email, body) for email, _ in fields["recipients"]]
+        for fields, body in zip(all_fields, bodies)
+    ]
+
 
 # ---------------------------------------------------------------------------
 # 6. SMTP: send the email
 # ---------------------------------------------------------------------------
 
-def send_email_smtp(to_emails: list[str], subject: str, body: str) -> None:
+# How long an idle connection is trusted before it is dropped and reopened.
+SMTP_IDLE_TIMEOUT_SECONDS = int(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", "30"))
+# A connection idle longer than this is checked with NOOP before reuse; one
+# used more recently is trusted, and a dropped one is caught by send_raw()'s
+# reconnect-and-retry instead.
+SMTP_NOOP_AFTER_SECONDS = 1.0
+SMTP_MAX_ATTEMPTS = 3
+# Transient server replies worth reconnecting and retrying on.
+SMTP_RETRYABLE_CODES = (421, 450, 454, 554)
+# Parallel connections used by send_emails_bulk(); keep within provider limits.
+SMTP_CONCURRENCY = int(os.getenv("SMTP_CONCURRENCY", "5"))
+# Fewer messages than this are sent serially on one pooled connection.
+BULK_SEND_THRESHOLD = 3
+# Messages sent on one connection before it is replaced; many providers cap
+# messages per session.
+SMTP_MAX_MESSAGES_PER_CONNECTION = 100
+# Implicit TLS (SMTP_SSL) skips the plaintext EHLO + STARTTLS round-trips.
+SMTP_USE_SSL = SMTP_PORT == 465 or os.getenv("SMTP_USE_SSL") == "1"
+
+# Built once: creating a context loads the system certificate store.
+_SSL_CONTEXT = ssl.create_default_context()
+# Last TLS session, offered on reconnect so the server can resume it.
+_tls_session: ssl.SSLSession | None = None
+
+
+class _ResumableSMTP_SSL(smtplib.SMTP_SSL):
+    """SMTP_SSL that offers the previous TLS session to skip a full handshake."""
+    def _get_socket(self, host, port, timeout):
+        if timeout is not None and not timeout:
+            raise ValueError("Non-blocking socket (timeout=0) is not supported")
+        new_socket = socket.create_connection((host, port), timeout, self.source_address)
+        return self.context.wrap_socket(
+            new_socket, server_hostname=self._host, session=_tls_session
+        )
+
+
+class SMTPConnection:
     """
-    Send an email via SMTP using the environment variables.
+    A logged-in SMTP session that is reused across sends, so the
+    STARTTLS + AUTH handshake is paid once per process instead of per email.
     """
-    if not to_emails:
-        raise ValueError("No recipient emails provided.")
+    def __init__(self):
+        self.conn: smtplib.SMTP | None = None
+        self.last_used = 0.0
+        # Messages sent since this connection was opened
+        self.sent = 0
+
+    def _connect(self) -> None:
+        """Open, secure and authenticate a new connection."""
+        global _tls_session
+        if SMTP_USE_SSL:
+            conn = _ResumableSMTP_SSL(SMTP_HOST, SMTP_PORT, context=_SSL_CONTEXT)
+        else:
+            conn = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+            conn.starttls(context=_SSL_CONTEXT)
+        conn.login(SMTP_USERNAME, SMTP_PASSWORD)
+        if SMTP_USE_SSL:
+            # Read after login so TLS 1.3 session tickets have arrived
+            _tls_session = conn.sock.session
+        self.conn = conn
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+    def _ensure_connected(self) -> None:
+        """
+        Drop connections that sat idle too long, reached the per-connection
+        message cap, or (after a pause) fail a NOOP, then (re)connect.
+        """
+        if self.conn is not None:
+            idle = time.monotonic() - self.last_used
+            if idle > SMTP_IDLE_TIMEOUT_SECONDS or self.sent >= SMTP_MAX_MESSAGES_PER_CONNECTION:
+                self.close()
+            elif idle > SMTP_NOOP_AFTER_SECONDS:
+                try:
+                    code, _ = self.conn.noop()
+                    if code != 250:
+                        self.close()
+                except (smtplib.SMTPException, OSError):
+                    self.close()
+        if self.conn is None:
+            self._connect()
+
+    def close(self) -> None:
+        """Close the connection, ignoring errors from an already-dead socket."""
+        if self.conn is None:
+            return
+        try:
+            self.conn.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self.conn = None
+
+    def send(self, to_emails: list[str], subject: str, body: str) -> None:
+        """Build and send one message on the live connection."""
+        self.send_raw(to_emails, build_message(to_emails, subject, body).as_bytes())
+
+    def send_raw(self, to_emails: list[str], payload: bytes) -> None:
+        """
+        Send an already-serialized message on the live connection.
+        Reconnects and retries with exponential backoff if the server
+        disconnects or answers with a transient error code.
+        """
+        for attempt in range(SMTP_MAX_ATTEMPTS):
+            try:
+                self._ensure_connected()
+                self.conn.sendmail(FROM_EMAIL, to_emails, payload)
+                self.last_used = time.monotonic()
+                self.sent += 1
+                return
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException) as e:
+                retryable = (
+                    isinstance(e, smtplib.SMTPServerDisconnected)
+                    or e.smtp_code in SMTP_RETRYABLE_CODES
+                )
+                self.close()
+                if not retryable or attempt == SMTP_MAX_ATTEMPTS - 1:
+                    raise
+                time.sleep(2 ** attempt)
 
-    msg = MIMEText(body, "plain", "utf-8")
+
+# CRLF line endings, and 7bit-safe output: sendmail() below doesn't ask for
+# 8BITMIME, so non-ASCII bodies must not go out as raw 8bit.
+_MESSAGE_POLICY = SMTP_POLICY.clone(cte_type="7bit")
+
+
+def build_message(to_emails: list[str], subject: str, body: str) -> EmailMessage:
+    """
+    Build the plain-text message for an outgoing email. set_content() picks
+    the lightest 7bit-safe transfer encoding: 7bit for pure-ASCII bodies,
+    otherwise the shorter of quoted-printable and base64 (typically
+    quoted-printable for a full email with a few en dashes or curly quotes).
+    """
+    msg = EmailMessage(policy=_MESSAGE_POLICY)
+    msg.set_content(body)
     msg["Subject"] = subject
     msg["From"] = f"{FROM_NAME} <{FROM_EMAIL}>"
     msg["To"] = ", ".join(to_emails)
+    return msg
+
+
+class SMTPPool:
+    """
+    Thread-safe pool of idle SMTPConnections, shared by every send in the
+    process. checkout() lends out an idle connection (or a new one) and
+    takes it back afterwards; its liveness is checked with NOOP when it is
+    next used, not when it is returned.
+    """
+    def __init__(self, size: int = SMTP_CONCURRENCY):
+        self._idle: queue.Queue[SMTPConnection] = queue.Queue(maxsize=size)
+
+    @contextlib.contextmanager
+    def checkout(self):
+        """Borrow a connection for the duration of a `with` block."""
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = SMTPConnection()
+        try:
+            yield connection
+        finally:
+            self._release(connection)
+
+    def _release(self, connection: SMTPConnection) -> None:
+        """Keep an open connection for reuse, unless the pool is already full."""
+        if connection.conn is None:
+            return
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def close_all(self) -> None:
+        """Close every idle connection (registered to run at exit)."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_smtp_pool = SMTPPool()
+atexit.register(_smtp_pool.close_all)
+
+
+def send_email_smtp(to_emails: list[str], subject: str, body: str,
+                    connection: SMTPConnection | None = None) -> None:
+    """
+    Send an email via SMTP using the environment variables.
+    Uses a pooled connection unless one is passed in.
+    """
+    if not to_emails:
+        raise ValueError("No recipient emails provided.")
+
+    if connection is not None:
+        connection.send(to_emails, subject, body)
+        return
+    with _smtp_pool.checkout() as connection:
+        connection.send(to_emails, subject, body)
+
+
+def send_emails_bulk(messages: list[tuple[list[str], str, str]],
+                     concurrency: int = SMTP_CONCURRENCY) -> None:
+    """
+    Send several (to_emails, subject, body) messages, e.g. one per attendee.
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        server.sendmail(FROM_EMAIL, to_emails, msg.as_string())
+    Small batches go out serially on one pooled connection. From
+    BULK_SEND_THRESHOLD messages on, `concurrency` workers each check out
+    their own connection and drain a shared queue. Raises the first send
+    error after all workers have finished.
+    """
+    # Serialize up front, on this thread. Messages sharing a subject and body
+    # reuse one message object with only the To header swapped, so the body
+    # is encoded once.
+    payloads: list[tuple[list[str], bytes]] = []
+    skeletons: dict[tuple[str, str], EmailMessage] = {}
+    for to_emails, subject, body in messages:
+        if not to_emails:
+            raise ValueError("No recipient emails provided.")
+        msg = skeletons.get((subject, body))
+        if msg is None:
+            msg = skeletons[(subject, body)] = build_message(to_emails, subject, body)
+        else:
+            msg.replace_header("To", ", ".join(to_emails))
+        payloads.append((to_emails, msg.as_bytes()))
+
+    if len(payloads) < BULK_SEND_THRESHOLD or concurrency <= 1:
+        with _smtp_pool.checkout() as connection:
+            for to_emails, payload in payloads:
+                connection.send_raw(to_emails, payload)
+        return
+
+    pending: queue.Queue = queue.Queue()
+    for item in payloads:
+        pending.put(item)
+
+    def worker() -> None:
+        with _smtp_pool.checkout() as connection:
+            while True:
+                try:
+                    to_emails, payload = pending.get_nowait()
+                except queue.Empty:
+                    return
+                connection.send_raw(to_emails, payload)
+
+    workers = min(concurrency, len(messages))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(worker) for _ in range(workers)]
+    for future in futures:
+        future.result()
 
 
 # ---------------------------------------------------------------------------
 # 7. Orchestration: the “agent” flow
 # ---------------------------------------------------------------------------
 
-def run_scheduler_agent(user_instruction: str, auto_send: bool = True) -> None:
+# How cancel mode lists matching events.
+_DATE_FMT = '%A, %B %d at %I:%M %p'
+
+
+def run_scheduler_agent(user_instruction: str, auto_send: bool = True,
+                        pretty_contacts: bool = False) -> None:
     # Initialize contact memory
     print(">> Initializing contact memory...")
-    contacts = ContactMemory(CONTACTS_FILE)
+    contacts = open_contact_memory(CONTACTS_FILE, pretty=pretty_contacts)
     
-    # Try to connect to Google Calendar
-    calendar_service = None
+    # Connect to Google Calendar in the background while Gemini parses the request
+    calendar_future = None
     if CALENDAR_AVAILABLE:
         print(">> Connecting to Google Calendar...")
-        calendar_service = get_calendar_service()
-        if calendar_service:
-            print("   ✓ Calendar connected")
-        else:
-            print("   ⚠ Calendar not available (missing credentials.json or auth failed)")
+        executor = ThreadPoolExecutor(max_workers=1)
+        calendar_future = executor.submit(connect_calendar_and_prefetch)
+        executor.shutdown(wait=False)
     else:
         print("   ⚠ Calendar API not installed (run: pip install -r requirements.txt)")
     
     print("\n>> Parsing meeting request with Gemini...")
     meeting = parse_meeting_request(user_instruction, contacts)
-    print("Parsed meeting object:")
-    print(json.dumps(meeting, indent=2))
-
-    # Save any new contacts from the parsed data
-    for attendee in meeting.get("attendees", []):
-        name = attendee.get("name")
-        email = attendee.get("email")
-        if name and email:
-            # Check if this is a new contact
-            existing = contacts.get_email(name)
-            if not existing:
-                print(f"   → Saving new contact: {name} <{email}>")
-                contacts.add_contact(name, email)
-            elif existing != email:
-                print(f"   → Updating contact: {name} <{email}>")
-                contacts.add_contact(name, email)
+
+    calendar_service = None
+    if calendar_future is not None:
+        calendar_service = calendar_future.result()
+        if calendar_service:
+            print("   ✓ Calendar connected")
+        else:
+            print("   ⚠ Calendar not available (missing credentials.json or auth failed)")
+
+    if DEBUG:
+        print("Parsed meeting object:")
+        print(json.dumps(meeting, indent=2))
+
+    # Save any new contacts from the parsed data in one batch
+    added, updated = contacts.add_contacts(
+        (attendee.get("name"), attendee.get("email")) for attendee in meeting.get("attendees", [])
+    )
+    for name, email in added:
+        print(f"   → Saving new contact: {name} <{email}>")
+    for name, email in updated:
+        print(f"   → Updating contact: {name} <{email}>")
+    contacts.flush()
 
     # Determine scheduling mode
     scheduling_mode = meeting.get("scheduling_mode", "proposal")
@@ -972,13 +2522,16 @@ def run_scheduler_agent(user_instruction: str, auto_send: bool = True) -> None:
             time_range_end = dt.datetime.fromisoformat(date_range_end_str)
         else:
             # Default: search next 30 days
-            time_range_start = dt.datetime.now()
-            time_range_end = dt.datetime.now() + dt.timedelta(days=30)
+            time_range_start = dt.datetime.now(dt.timezone.utc)
+            time_range_end = time_range_start + dt.timedelta(days=30)
         
         print(f"\n>> Searching for events to cancel...")
         print(f"   Search range: {time_range_start.strftime('%Y-%m-%d')} to {time_range_end.strftime('%Y-%m-%d')}")
         
-        matching_events = search_events(calendar_service, cancel_criteria, time_range_start, time_range_end)
+        matching_events = search_events(
+            calendar_service, cancel_criteria, time_range_start, time_range_end,
+            meeting.get("time_zone") or DEFAULT_TIME_ZONE,
+        )
         
         if not matching_events:
             print("\n[INFO] No matching events found.")
@@ -989,17 +2542,9 @@ def run_scheduler_agent(user_instruction: str, auto_send: bool = True) -> None:
         
         # Display matching events
         for idx, event in enumerate(matching_events, 1):
-            start_str = event['start']
-            try:
-                if 'T' in start_str:
-                    start_time = dt.datetime.fromisoformat(start_str.replace('Z', '+00:00')).replace(tzinfo=None)
-                    date_time_display = start_time.strftime('%A, %B %d at %I:%M %p')
-                else:
-                    date_time_display = start_str
-            except:
-                date_time_display = start_str
+            date_time_display = event['_start_dt'].strftime(_DATE_FMT) if event['_start_dt'] else event['start']
             
-            attendee_names = ", ".join([a.get('displayName', a.get('email', 'Unknown')) for a in event['attendees'][:3]])
+            attendee_names = ", ".join(map(_display_name, event['attendees'][:3]))
             if len(event['attendees']) > 3:
                 attendee_names += f" +{len(event['attendees']) - 3} more"
             
@@ -1007,81 +2552,129 @@ def run_scheduler_agent(user_instruction: str, auto_send: bool = True) -> None:
             print(f"      {date_time_display}")
             print(f"      Attendees: {attendee_names}\n")
         
-        # If multiple matches, ask user to select
-        selected_event = None
+        # If multiple matches, ask user to select one, several, or all
+        selected_events = []
         if len(matching_events) == 1:
-            selected_event = matching_events[0]
+            selected_events = matching_events
             print(">> This is the only matching event.\n")
         else:
             while True:
                 try:
-                    selection = input(f"Which event would you like to cancel? [1-{len(matching_events)}] or 'q' to quit: ").strip()
-                    if selection.lower() == 'q':
+                    selection = input(
+                        f"Which event(s) would you like to cancel? [1-{len(matching_events)}, "
+                        f"e.g. 1,3], 'a' for all, or 'q' to quit: "
+                    ).strip().lower()
+                    if selection == 'q':
+                        discard_last_parse()
                         print("Cancelled. No events were deleted.")
                         return
-                    idx = int(selection)
-                    if 1 <= idx <= len(matching_events):
-                        selected_event = matching_events[idx - 1]
+                    if selection == 'a':
+                        selected_events = matching_events
+                        break
+                    indices = [int(part) for part in selection.split(",")]
+                    if all(1 <= idx <= len(matching_events) for idx in indices):
+                        selected_events = [matching_events[idx - 1] for idx in dict.fromkeys(indices)]
                         break
                     else:
-                        print(f"Please enter a number between 1 and {len(matching_events)}.")
+                        print(f"Please enter numbers between 1 and {len(matching_events)}.")
                 except ValueError:
                     print("Invalid input. Please enter a number.")
         
         # Confirm deletion
         print("\n" + "=" * 60)
-        print("EVENT TO BE CANCELLED:")
-        print("=" * 60)
-        print(f"Subject: {selected_event['summary']}")
-        try:
-            start_time = dt.datetime.fromisoformat(selected_event['start'].replace('Z', '+00:00')).replace(tzinfo=None)
-            print(f"When: {start_time.strftime('%A, %B %d, %Y at %I:%M %p')}")
-        except:
-            print(f"When: {selected_event['start']}")
-        print(f"Attendees: {len(selected_event['attendees'])} people")
+        print("EVENT TO BE CANCELLED:" if len(selected_events) == 1 else
+              f"{len(selected_events)} EVENTS TO BE CANCELLED:")
         print("=" * 60)
+        for selected_event in selected_events:
+            print(f"Subject: {selected_event['summary']}")
+            if selected_event['_start_dt']:
+                print(f"When: {selected_event['_start_dt'].strftime('%A, %B %d, %Y at %I:%M %p')}")
+            else:
+                print(f"When: {selected_event['start']}")
+            print(f"Attendees: {len(selected_event['attendees'])} people")
+            print("=" * 60)
+        
+        # Only events with attendee emails need a notification. Start drafting
+        # those now, so the Gemini round-trip overlaps the confirmation prompt
+        # and the deletes; drafts for events left undeleted are discarded.
+        notify = []
+        for selected_event in selected_events:
+            fields = _cancellation_fields(selected_event)
+            if fields["recipients"]:
+                notify.append((selected_event, fields))
+        calendar_notifies = CALENDAR_NOTIFICATIONS and not LLM_CANCEL_EMAILS
+        drafts = None
+        if notify and not calendar_notifies:
+            drafter = ThreadPoolExecutor(max_workers=1)
+            drafts = drafter.submit(
+                draft_cancellation_emails,
+                [event for event, _ in notify], [fields for _, fields in notify],
+            )
+            drafter.shutdown(wait=False)
         
         if not auto_send:
-            confirm = input("\n⚠️  Are you sure you want to DELETE this event? [y/N]: ").strip().lower()
+            target = "this event" if len(selected_events) == 1 else f"these {len(selected_events)} events"
+            confirm = input(f"\n⚠️  Are you sure you want to DELETE {target}? [y/N]: ").strip().lower()
             if confirm != 'y':
-                print("Cancelled. Event was not deleted.")
+                discard_last_parse()
+                print("Cancelled. No events were deleted.")
                 return
         
-        # Delete the event
-        print("\n>> Deleting calendar event...")
-        success = delete_calendar_event(calendar_service, selected_event['id'])
+        # Delete the events
+        print("\n>> Deleting calendar event(s)...")
+        # Google's own notice only when no SMTP notice follows, so attendees
+        # never get both
+        deleted_ids = set(delete_calendar_events(
+            calendar_service, [selected_event['id'] for selected_event in selected_events],
+            send_updates="all" if calendar_notifies else "none",
+        ))
+        deleted_events = []
+        for selected_event in selected_events:
+            if selected_event['id'] in deleted_ids:
+                print(f"   ✓ Deleted from calendar: {selected_event['summary']}")
+                deleted_events.append(selected_event)
         
-        if not success:
+        if not deleted_events:
             print("\n[ERROR] Failed to delete event. See error above.")
             return
         
-        print("   ✓ Event deleted from calendar")
-        
-        # Draft cancellation email
-        print("\n>> Drafting cancellation email with Gemini...")
-        email_body = draft_cancellation_email(selected_event)
-        print("\nGenerated cancellation email:\n")
-        print("=" * 60)
-        print(email_body)
-        print("=" * 60)
-        
-        # Get recipient emails from the event
-        recipients = [att['email'] for att in selected_event['attendees'] if att.get('email')]
+        if calendar_notifies:
+            print("Done. Google Calendar sent the cancellation to attendees.")
+            return
         
-        if not recipients:
+        deleted_notify = [(event, fields) for event, fields in notify if event['id'] in deleted_ids]
+        if not deleted_notify:
             print("\n[INFO] No attendees with email addresses. No notification sent.")
-            print("Event has been deleted from your calendar.")
+            print("Event(s) deleted from your calendar.")
             return
         
+        print("\n>> Drafting cancellation email(s)...")
+        drafted = dict(zip((event['id'] for event, _ in notify), drafts.result()))
+        
+        messages = []
+        for deleted_event, fields in deleted_notify:
+            emails = drafted[deleted_event['id']]
+            print(f"\nGenerated cancellation email for {deleted_event['summary']}:\n")
+            print("=" * 60)
+            print(emails[0][1])
+            print("=" * 60)
+            if len({body for _, body in emails}) > 1:
+                print(f"(Greeting personalized for each of the {len(emails)} recipients)")
+            # One message per attendee, so recipients don't see each other's
+            # addresses; send_emails_bulk() encodes a shared body once and
+            # spreads the sends over pooled connections
+            subject = f"Cancelled: {deleted_event['summary']}"
+            messages.extend(([email], subject, email_body) for email, email_body in emails)
+        
         if not auto_send:
-            answer = input("\nSend this cancellation email to attendees? [y/N]: ").strip().lower()
+            answer = input("\nSend the cancellation email(s) to attendees? [y/N]: ").strip().lower()
             if answer != 'y':
-                print("Email not sent. Event has been deleted from your calendar.")
+                print("Email not sent. Event(s) deleted from your calendar.")
                 return
         
-        print("\n>> Sending cancellation email via SMTP...")
-        send_email_smtp(recipients, f"Cancelled: {selected_event['summary']}", email_body)
-        print("Done. Cancellation email sent!")
+        print("\n>> Sending cancellation email(s) via SMTP...")
+        send_emails_bulk(messages)
+        print("Done. Cancellation email(s) sent!")
         return
     
     # Collect recipient emails from attendees (for direct/proposal modes)
@@ -1113,12 +2706,13 @@ def run_scheduler_agent(user_instruction: str, auto_send: bool = True) -> None:
             print(f"   Subject: {meeting['subject']}")
             print(f"   When: {start_time.strftime('%A, %B %d at %I:%M %p')}")
             print(f"   Duration: {duration_minutes} minutes")
-            print(f"   Attendees: {', '.join([a.get('name', a.get('email', 'Unknown')) for a in meeting.get('attendees', [])])}")
+            print(f"   Attendees: {', '.join(a.get('name') or a.get('email') or 'Unknown' for a in meeting.get('attendees', []))}")
             
             # Ask for confirmation BEFORE creating event
             if not auto_send:
                 confirm = input("\n>> Proceed with creating this event and sending confirmation? [y/N]: ").strip().lower()
                 if confirm != 'y':
+                    discard_last_parse()
                     print("Aborted. No event was created.")
                     return
             
@@ -1133,9 +2727,18 @@ def run_scheduler_agent(user_instruction: str, auto_send: bool = True) -> None:
             print(f"   ✓ Event created: {event_details.get('summary')}")
             print(f"   ✓ Event link: {event_details.get('link')}")
             
-            # Draft confirmation email
-            print("\n>> Drafting confirmation email with Gemini...")
-            email_body = draft_confirmation_email(meeting, event_details, start_time, end_time)
+            # The calendar invitation already covers a stock confirmation
+            if CALENDAR_NOTIFICATIONS and not meeting.get("extra_context") and not LLM_CONFIRMATION_EMAILS:
+                print("Done. Google Calendar sent the invitation to attendees.")
+                return
+            
+            # Use the confirmation drafted during parsing, or draft one now
+            email_body = fill_confirmation_email(meeting, event_details)
+            if email_body:
+                print("\n>> Using confirmation email drafted during parsing...")
+            else:
+                print("\n>> Drafting confirmation email...")
+                email_body = draft_confirmation_email(meeting, event_details, start_time, end_time)
             print("\nGenerated confirmation email:\n")
             print("=" * 60)
             print(email_body)
@@ -1150,11 +2753,16 @@ def run_scheduler_agent(user_instruction: str, auto_send: bool = True) -> None:
     # === PROPOSAL MODE (default/fallback) ===
     print("\n>> Picking candidate time slots...")
     slots = pick_candidate_slots(meeting, calendar_service)
-    print("Candidate slots:")
-    print(json.dumps(slots, indent=2))
+    if DEBUG:
+        print("Candidate slots:")
+        print(json.dumps(slots, indent=2, default=lambda d: d.isoformat(timespec="minutes")))
 
-    print("\n>> Drafting proposal email with Gemini...")
-    email_body = draft_email(meeting, slots)
+    email_body = fill_proposal_email(meeting, slots)
+    if email_body:
+        print("\n>> Using proposal email drafted during parsing...")
+    else:
+        print("\n>> Drafting proposal email with Gemini...")
+        email_body = draft_email(meeting, slots)
     print("\nGenerated proposal email:\n")
     print("=" * 60)
     print(email_body)
@@ -1163,6 +2771,7 @@ def run_scheduler_agent(user_instruction: str, auto_send: bool = True) -> None:
     if not auto_send:
         answer = input("\nSend this proposal email? [y/N]: ").strip().lower()
         if answer != "y":
+            discard_last_parse()
             print("Aborted. Email was not sent.")
             return
 
@@ -1176,9 +2785,14 @@ def run_scheduler_agent(user_instruction: str, auto_send: bool = True) -> None:
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python scheduler_agent.py \"Your scheduling instruction...\"")
+    args = sys.argv[1:]
+    # --pretty-contacts: save the contacts file indented, for reading by hand
+    pretty_contacts = "--pretty-contacts" in args
+    args = [arg for arg in args if arg != "--pretty-contacts"]
+
+    if not args:
+        print("Usage: python scheduler.py [--pretty-contacts] \"Your scheduling instruction...\"")
         sys.exit(1)
 
-    instruction = sys.argv[1]
-    run_scheduler_agent(instruction, auto_send=False)
+    instruction = args[0]
+    run_scheduler_agent(instruction, auto_send=False, pretty_contacts=pretty_contacts)